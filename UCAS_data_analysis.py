@@ -89,7 +89,6 @@
 
 # %%
 import pandas as pd
-from pandas_profiling import ProfileReport
 import seaborn
 sns.set_theme()
 import altair as alt
@@ -98,21 +97,28 @@ import altair as alt
 # %matplotlib inline
 
 # %%
-data = pd.read_csv('./UCAS_data_file.csv')
+# typed loader: categorical dimension columns, int16 `Cycle`, float32 `value`
+from ucas_data import load_data
+
+data = load_data('./UCAS_data_file.csv')
 
 # %%
 data.info()
 
 # %%
-# profile = ProfileReport(data, title="Pandas Profiling Report")
-# profile
+# single-pass profile of the UCAS schema (pandas-profiling is too slow here):
+# cardinalities, null/zero/negative counts by `statistic` and `inst_all`,
+# and the institution-cycles with all-zero values
+from ucas_data import profile_data
+
+profile = profile_data(data)
+profile['value']
 
 # %% [markdown]
-# The profile generated by `pandas-profiling` tells us the following:
+# The profile tells us the following:
 #
 # - `inst_all` and `INSTITUTION_CODE` have a high cardinality: 132 distinct values 
 # - `Cycle` is a time period (year)
-# - high correlation between `statistic` and `agegroup`
 # - `value` has 7133 (1.8%) missing values 
 # - `value` has 4606 (1.2%) zeros 
 
@@ -142,7 +148,12 @@ for i in data.columns[2:-1]:
 data[['inst_all', 'INSTITUTION_CODE']]
 
 # %%
-all(data['inst_all'].apply(lambda x: x[:3]) == data['INSTITUTION_CODE'])
+# code -> name index over the distinct institutions: checks and filters below
+# run on the ~130 distinct values and the categorical codes, not on every row
+from ucas_data import InstitutionIndex
+
+institutions = InstitutionIndex.from_series(data['inst_all'])
+institutions.check_codes(data['inst_all'], data['INSTITUTION_CODE'])
 
 # %%
 data = data.drop(columns='INSTITUTION_CODE')
@@ -181,38 +192,28 @@ data.loc[data['value'] < 0]['statistic'].unique()
 # We know that there's a small amount of null values: it's probable that most of these values aren't missing but simply null (no applicants of `Asian ethnic group` in a given year, for example), but we want to check whether missing values are limited to a single university or specific columns. 
 
 # %%
-data_null = data.loc[data["value"] == 0]
+# zero values per `statistic`, counted by the profile
+pd.DataFrame(profile['breakdowns']['statistic']).loc[lambda x: x['zeros'] > 0]
 
-for i in data_null.columns[:-1]:
-    print(
-        f'Unique values for {i}:\n'
-        f'\t{data_null[i].unique()}\n'
-    )
+# %%
+# zero values per institution
+pd.DataFrame(profile['breakdowns']['inst_all']).sort_values('zeros', ascending=False)
 
 # %% [markdown]
 # Doesn't seem like the problem is with a single university. 
 
 # %% [markdown]
-# Let's check whether any university has all null values:
+# Let's check whether any university has all null values in some cycles:
 
 # %%
-data.groupby('inst_all').max()['value'].apply(int).sort_values().reset_index()
-
-# %%
-data.groupby(['Cycle', 'inst_all']).max()\
-.reset_index().reindex(columns=['inst_all', 'Cycle', 'value'])\
-.sort_values(['value', 'inst_all', 'Cycle'])\
-.loc[lambda x: x['value'] == 0]
+# institution-cycles whose values are all zero (or missing), found by the profile
+pd.DataFrame(profile['all_zero_cycles'])
 
 # %% [markdown]
 # We can see that A66, W01, and W05 seemingly are missing some values for the first few years of the dataset: we could drop only the missing years, but, given that these 3 universities represent a very small part of the data, we can afford to drop them entirely without it affecting our analysis. 
 
 # %%
-data = data.loc[
-    ~data['inst_all'].str.startswith('A66')
-    & ~data['inst_all'].str.startswith('W01')
-    & ~data['inst_all'].str.startswith('W05')
-]
+data = data.loc[~institutions.mask(data['inst_all'], ['A66', 'W01', 'W05'])]
 
 # %% [markdown]
 # ---
@@ -224,13 +225,12 @@ data = data.loc[
 # We also know that there are some missing values. 
 
 # %%
-data_na = data.loc[data['value'].isna()]
+# missing values per institution, counted by the profile (before dropping A66, W01 and W05)
+pd.DataFrame(profile['breakdowns']['inst_all']).loc[lambda x: x['nulls'] > 0].sort_values('nulls')
 
-for i in data_na.columns[:-1]:
-    print(
-        f'Unique values for {i}:\n'
-        f'\t{data_na[i].unique()}\n'
-    )
+# %%
+# missing values per `statistic`
+pd.DataFrame(profile['breakdowns']['statistic']).loc[lambda x: x['nulls'] > 0]
 
 # %% [markdown]
 # The missing values can be found in all universities, but are limited to the `statistic` values `Average offer rate`, `Percentage point difference between offer rate and average offer rate`, `Contribution of group to the average offer rate`, and `Offer rate`. 
@@ -257,31 +257,12 @@ for i in data_na.columns[:-1]:
 # If `18 years old` represents the majority of values, we can drop the `All ages` rows. 
 
 # %%
-# create dataframe that contains totals for each statistic
-# and only the absolute values (we drop rates, percentages, etc.)
-agegroup_data = data.loc[
-    (data['equality_dimension'] == 'Total')
-    & (~data['statistic'].str.contains('|'.join(['per 10', 'rate', 'percent'])))
-].drop(
-    columns='equality_dimension'
-)
+# totals of `18 year olds` and `All ages` side by side for each absolute
+# statistic (we drop rates, percentages, etc.), pivoted in a single reshape,
+# with the ratio of `18 years old` compared to `All ages`
+from ucas_data import agegroup_proportions
 
-# create separate dataframes for `18 years old` and `All ages`
-agegroup_18_data = agegroup_data.loc[agegroup_data['agegroup'] == '18 year olds'].drop(columns='agegroup')
-agegroup_all_data = agegroup_data.loc[agegroup_data['agegroup'] != '18 year olds'].drop(columns='agegroup')
-
-# merge the above dataframes (left join on non-value columns)
-agegroups_data = pd.merge(
-    agegroup_18_data,
-    agegroup_all_data,
-    how='right',
-    left_on=['inst_all', 'Cycle', 'statistic'],
-    right_on=['inst_all', 'Cycle', 'statistic'],
-    suffixes=('_18yo', '_all')
-)
-
-# create column with ratio of `18 years old` compared to `All ages`
-agegroups_data['18yo_proportion'] = agegroups_data['value_18yo'] / agegroups_data['value_all']
+agegroups_data = agegroup_proportions(data)
 
 agegroups_data.sort_values('18yo_proportion')
 
@@ -311,9 +292,11 @@ data = data.loc[data['agegroup'] != 'All ages'].reset_index(drop=True)
 # %%
 # abs_rows = [row for row in data['equality_dimension'].unique() if all(match not in row for match in ['per 10', 'rate', 'percent'])]
 
-ethnicity_cols = [col for col in data['equality_dimension'].unique() if 'ethnic' in col]
-gender_cols = [col for col in data['equality_dimension'].unique() if 'en' in col]
-polar_cols = [col for col in data['equality_dimension'].unique() if 'POLAR' in col]
+from ucas_data.dimensions import axis_dimensions
+
+ethnicity_cols = list(axis_dimensions('ethnicity'))
+gender_cols = list(axis_dimensions('sex'))
+polar_cols = list(axis_dimensions('polar'))
 
 print(
     f'ethnicity_cols:\n\t{ethnicity_cols}\n\n'
@@ -339,7 +322,11 @@ data['statistic'].unique()
 # We won't touch the `statistic` column for now, but wait until we know what we want to be looking at.
 
 # %%
-data.to_csv('./data_clean.csv')
+# the steps above are packaged as `clean_data`: its result is cached as an
+# Arrow file keyed on the source hash, so later runs only memory-map it
+from ucas_data import cached_clean_data
+
+data = cached_clean_data('./UCAS_data_file.csv')
 
 # %% [markdown]
 # ## Data analysis
@@ -351,8 +338,11 @@ data.to_csv('./data_clean.csv')
 # We are working with `University of Birmingham`. 
 
 # %%
-# unique values in `inst_all` that contain 'University of Birmingham'
-data[data['inst_all'].str.contains('University of Birmingham', case=False)]['inst_all'].unique()
+# fuzzy name -> `inst_all` resolver over the distinct institutions (memoised)
+from ucas_data.resolver import InstitutionResolver
+
+resolver = InstitutionResolver(institutions)
+resolver.matches('University of Birmingham')
 
 # %% [markdown]
 # ### Reference points and model universities
@@ -369,10 +359,7 @@ data[data['inst_all'].str.contains('University of Birmingham', case=False)]['ins
 # - University of East Anglia
 
 # %%
-data[data['inst_all'].str.contains(
-    '|'.join(['University of Manchester', 'University of Sheffield', 'University of East Anglia']), 
-    case=False
-)]['inst_all'].unique()
+resolver.resolve_all(['University of Manchester', 'University of Sheffield', 'University of East Anglia'])
 
 # %% [markdown]
 # We have also identified models (universities that are 5-10 places higher on at least 2 out of 3 rankings): 
@@ -380,10 +367,7 @@ data[data['inst_all'].str.contains(
 # - University of York
 
 # %%
-data[data['inst_all'].str.contains(
-    '|'.join(["King.?s College London", 'University of York']), 
-    case=False
-)]['inst_all'].unique()
+resolver.resolve_all(["King's College London", 'University of York'])
 
 # %% [markdown]
 # ### `universities_data`
@@ -393,9 +377,9 @@ data[data['inst_all'].str.contains(
 
 # %%
 # create df with UoB, the reference universities, and the model ones
-universities_data = data[data['inst_all'].str.contains(
-    '|'.join(['B32', 'M20', 'E14', 'S18', 'K60', 'Y50']), 
-    case=False
+universities_data = data[institutions.mask(
+    data['inst_all'],
+    ['B32', 'M20', 'E14', 'S18', 'K60', 'Y50']
 )]
 
 # %% [markdown]
@@ -427,21 +411,18 @@ universities_data.pivot_table(
 # We want to look at aspects of the data that are not already covered by UCAS [in their (very basic) reports](https://www.ucas.com/file/144876/download?token=hr_HRBqo#page=7). 
 
 # %% [markdown]
-# First, we need to prepare our dataframe for our visualisation library (altair). 
+# First, we need the order in which our visualisation library (altair) should show the universities. 
 
 # %%
-# altair requires datetime column for plotting time series
-universities_data.loc[:, 'Cycle'] = pd.to_datetime(universities_data['Cycle'], format='%Y')
-
 # altair requires a list of labels to sort faceted charts
-universities_order = [
-    'B32 University of Birmingham',
-    'M20 University of Manchester',
-    'E14 University of East Anglia UEA',
-    'S18 University of Sheffield',
-    'K60 Kings College London University of London',
-    'Y50 University of York'
-]
+universities_order = resolver.resolve_all([
+    'University of Birmingham',
+    'University of Manchester',
+    'University of East Anglia',
+    'University of Sheffield',
+    "King's College London",
+    'University of York',
+])
 
 # %% [markdown]
 # #### Offer rate
@@ -449,36 +430,11 @@ universities_order = [
 # %% [markdown]
 # First, we'll look into the `Offer rate` depending on the POLAR4 quintile in our different universities. 
 
-# %%
-# create df with `Offer rate` data
-offer_rate = universities_data[universities_data['statistic'] == 'Offer rate']
-
 # %%
 # plot offer rates in 2010-2021 by university (faceted line plot)
-chart = alt.Chart(offer_rate)\
-.mark_line(point=True)\
-.encode(
-    x=alt.X('Cycle:T', title='Year'),
-    y=alt.Y('value:Q', title='Offer rate'),
-    color=alt.Color('equality_dimension:N', title='POLAR4'),
-    tooltip=(
-        alt.Tooltip('inst_all:N', title='University'),
-        alt.Tooltip('equality_dimension:N', title='POLAR4'),
-        alt.Tooltip('value:Q', title='Offer rate'),
-    )
-)\
-.facet(
-    facet=alt.Facet('inst_all:N', title=None, sort=universities_order),
-    columns=2,
-    title={
-        'text': 'Offer rate in 2010-2021 by university',
-        'anchor': 'middle',
-        'fontSize': 15,
-        'dy': -10
-    }
-)
+from ucas_data import offer_rate_chart
 
-chart
+offer_rate_chart(universities_data, universities_order)
 
 # %% [markdown]
 # **Main point: UoB has a historically wide and stagnating amplitude between offer rates for Q1 and Q5, while most other universities in our benchmark either have a narrow amplitude or are strongly improving.**
@@ -503,36 +459,11 @@ chart
 #
 # We could be looking at `All placed applicants`, but `Offer rates` is calculated based on the number of `June deadline applications`, so it directly affects primarily the June deadline applicants. This population represents a vast majority of `All placed applicants` anyway. 
 
-# %%
-# create df with `Placed June deadline applicants` data
-placed_applicants = universities_data[universities_data['statistic'] == 'Placed June deadline applicants']
-
 # %%
 # plot placed June deadline applicants in 2010-2021 by university (faceted stacked area plot)
-chart = alt.Chart(placed_applicants)\
-.mark_area(opacity=.8, stroke='white', strokeWidth=2)\
-.encode(
-    x=alt.X('Cycle:T', title='Year'),
-    y=alt.Y('value:Q', title='Placed June deadline applicants (percentage)', stack='normalize'),
-    color=alt.Color('equality_dimension:N', title='POLAR4'),
-    tooltip=(
-        alt.Tooltip('inst_all:N', title='University'),
-        alt.Tooltip('equality_dimension:N', title='POLAR4'),
-        alt.Tooltip('value:Q', title='Placed June deadline applicants'),
-    )
-)\
-.facet(
-    facet=alt.Facet('inst_all:N', title=None, sort=universities_order),
-    columns=2,
-    title={
-        'text': 'Placed June deadline applicants in 2010-2021 by university',
-        'anchor': 'middle',
-        'fontSize': 15,
-        'dy': -10
-    }
-)
+from ucas_data import placed_applicants_chart
 
-chart
+placed_applicants_chart(universities_data, universities_order)
 
 # %% [markdown]
 # **Main point: University of Birmingham is average when it comes to the proportion of placed June deadline applicants from lower POLAR4 quintiles**
@@ -0,0 +1,176 @@
+"""Time and memory-profile each stage of the pipeline on synthetic data.
+
+    python -m benchmarks.pipeline [--scales 1 10 100] [--output bench.json]
+                                  [--compare previous.json]
+
+For every scale, a synthetic UCAS file is generated (untraced, tracing
+slows CSV writing down by an order of magnitude) and run through the
+load -> clean -> cache -> analyse stages twice: each stage records its wall
+time in the first run, untraced, and its peak traced memory in the second
+(`tracemalloc`, which sees NumPy and pandas buffers but not Arrow's
+allocator), with the number of rows it produced. Results are written as
+JSON so that runs can be compared with `--compare`.
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from ucas_data import (
+    Cube,
+    agegroup_proportions,
+    benchmark,
+    clean_data,
+    derive,
+    load_data,
+    profile_data,
+)
+from ucas_data.cache import read_cache, write_cache
+from ucas_data.synthetic import write_synthetic
+
+SCALES = (1, 10, 100)
+PEERS = 5
+
+
+def random_peers(data, seed=0):
+    """Peer mapping giving each institution `PEERS` random peers."""
+    rng = np.random.default_rng(seed)
+    codes = [label[:3] for label in data['inst_all'].cat.categories]
+    return {
+        code: [codes[j] for j in rng.choice(len(codes), size=min(PEERS, len(codes)), replace=False)]
+        for code in codes
+    }
+
+
+def stages(workdir, scale):
+    """Path of the synthetic file and the (name, function) pairs of the stages.
+
+    Each function takes and extends a state dict and returns its row count.
+    """
+    csv = Path(workdir) / f'synthetic-{scale}.csv'
+    feather = Path(workdir) / f'synthetic-{scale}.feather'
+
+    def load(state):
+        state['data'] = load_data(csv)
+        return len(state['data'])
+
+    def clean(state):
+        state['clean'] = clean_data(state['data'])
+        return len(state['clean'])
+
+    def cache_write(state):
+        write_cache(state['clean'], feather)
+        return len(state['clean'])
+
+    def cache_read(state):
+        return len(read_cache(feather))
+
+    def profile(state):
+        profile_data(state['data'])
+        return len(state['data'])
+
+    def agegroup(state):
+        return len(agegroup_proportions(state['data']))
+
+    def cube(state):
+        state['cube'] = Cube.from_frame(state['clean'])
+        return int(state['cube'].mask.sum())
+
+    def fill(state):
+        filled, _ = derive(state['cube'])
+        return int(filled.mask.sum())
+
+    def metrics(state):
+        return len(benchmark(state['clean'], random_peers(state['clean'])))
+
+    return csv, [
+        ('load', load),
+        ('clean', clean),
+        ('cache_write', cache_write),
+        ('cache_read', cache_read),
+        ('profile', profile),
+        ('agegroup', agegroup),
+        ('cube', cube),
+        ('derive', fill),
+        ('metrics', metrics),
+    ]
+
+
+def run(scales=SCALES, workdir=None):
+    """Benchmark every stage at every scale; returns a list of records."""
+    records = []
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        for scale in scales:
+            state = {}
+            csv, scale_stages = stages(tmp, scale)
+            start = time.perf_counter()
+            rows = write_synthetic(csv, scale)
+            print(
+                f'{scale:>5}x {"generate":<12} {time.perf_counter() - start:9.3f} s {rows:>23}',
+                file=sys.stderr,
+            )
+            # tracing slows allocations down: stages are timed in an untraced
+            # pass, and their peak memory measured in a second one
+            timed, traced = {}, {}
+            times = []
+            for name, stage in scale_stages:
+                start = time.perf_counter()
+                rows = stage(timed)
+                times.append((time.perf_counter() - start, rows))
+            for (name, stage), (seconds, rows) in zip(scale_stages, times):
+                tracemalloc.start()
+                stage(traced)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                records.append({
+                    'scale': scale,
+                    'stage': name,
+                    'seconds': seconds,
+                    'peak_bytes': peak,
+                    'rows': rows,
+                })
+                print(
+                    f'{scale:>5}x {name:<12} {seconds:9.3f} s {peak / 2**20:10.1f} MiB {rows:>12}',
+                    file=sys.stderr,
+                )
+    return records
+
+
+def compare(records, previous):
+    """Print the time and memory ratios of `records` against `previous`."""
+    before = {(r['scale'], r['stage']): r for r in previous}
+    for record in records:
+        old = before.get((record['scale'], record['stage']))
+        if old is None:
+            continue
+        print(
+            f"{record['scale']:>5}x {record['stage']:<12}"
+            f" time x{record['seconds'] / old['seconds']:.2f}"
+            f" memory x{record['peak_bytes'] / max(old['peak_bytes'], 1):.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', nargs='+', type=float, default=SCALES)
+    parser.add_argument('--workdir', help='directory for the generated files')
+    parser.add_argument('--output', help='JSON file of the results')
+    parser.add_argument('--compare', help='JSON file of a previous run')
+    args = parser.parse_args(argv)
+
+    records = run([int(s) if s.is_integer() else s for s in args.scales], args.workdir)
+    if args.output:
+        Path(args.output).write_text(json.dumps(records, indent=2))
+    if args.compare:
+        compare(records, json.loads(Path(args.compare).read_text()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
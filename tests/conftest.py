@@ -0,0 +1,13 @@
+import pytest
+
+from ucas_data import clean_data, synthetic_data
+
+
+@pytest.fixture(scope='session')
+def raw():
+    return synthetic_data(scale=0.1)
+
+
+@pytest.fixture(scope='session')
+def clean(raw):
+    return clean_data(raw)
@@ -0,0 +1,28 @@
+from ucas_data.agegroup import KEYS, AgegroupProportions, agegroup_proportions
+
+
+def test_empty_selection(raw):
+    code = raw['inst_all'].cat.categories[0][:3]
+    rows = raw[~raw['inst_all'].str.startswith(code)]
+
+    proportions = agegroup_proportions(rows, [code])
+
+    assert proportions.empty
+    assert list(proportions.columns) == [*KEYS, 'value_18yo', 'value_all', '18yo_proportion']
+
+
+def test_append_cycle_without_institution(raw):
+    code = raw['inst_all'].cat.categories[0][:3]
+    last = raw['Cycle'].max()
+    history = raw[raw['Cycle'] < last]
+    rows = raw[(raw['Cycle'] == last) & ~raw['inst_all'].str.startswith(code)]
+
+    memo = AgegroupProportions(history)
+    before = memo.get([code])
+    everyone = memo.get()
+    memo.append_cycle(rows)
+
+    assert len(memo.get([code])) == len(before)
+    assert set(memo.get()['Cycle']) == set(everyone['Cycle']) | {last}
+    assert len(memo.get()) == len(agegroup_proportions(memo.data))
+    assert memo.get([code]).dtypes.equals(before.dtypes)
@@ -0,0 +1,23 @@
+import pytest
+
+from ucas_data.cache import cache_path, cached_clean_data
+
+pytest.importorskip('pyarrow')
+
+
+def test_stale_cleanup_keeps_other_sources(raw, tmp_path):
+    sample = raw[raw['Cycle'] >= raw['Cycle'].max() - 1]
+    source, other = tmp_path / 'UCAS.csv', tmp_path / 'UCAS-2022.csv'
+    sample.to_csv(source, index=False)
+    sample.to_csv(other, index=False)
+    cache_dir = tmp_path / 'cache'
+
+    cached_clean_data(other, cache_dir)
+    cached_clean_data(source, cache_dir)
+    old = cache_path(source, cache_dir)
+    sample.iloc[:-1].to_csv(source, index=False)
+    cached_clean_data(source, cache_dir)
+
+    assert cache_path(other, cache_dir).exists()
+    assert cache_path(source, cache_dir).exists()
+    assert not old.exists()
@@ -0,0 +1,28 @@
+import importlib
+import subprocess
+import sys
+
+import ucas_data
+
+
+def test_exports_resolve_to_objects():
+    for name in ucas_data.__all__:
+        assert not isinstance(getattr(ucas_data, name), type(ucas_data)), name
+
+
+def test_derive_is_the_function():
+    importlib.import_module('ucas_data.derive')
+    from ucas_data import derive
+
+    assert callable(ucas_data.derive)
+    assert derive is ucas_data.derive
+    assert ucas_data.derive.__module__ == 'ucas_data.derive'
+
+
+def test_submodules_resolve():
+    assert ucas_data.trends.__name__ == 'ucas_data.trends'
+
+
+def test_derive_after_submodule_import():
+    code = 'import ucas_data.derive, ucas_data; assert callable(ucas_data.derive)'
+    subprocess.run([sys.executable, '-c', code], check=True)
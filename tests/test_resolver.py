@@ -0,0 +1,46 @@
+import pytest
+
+from ucas_data.resolver import InstitutionResolver, has_words, normalise
+
+
+@pytest.fixture(scope='module')
+def resolver(raw):
+    return InstitutionResolver.from_series(raw['inst_all'])
+
+
+@pytest.mark.parametrize('query, code', [
+    ('University of Birmingham', 'B32'),
+    ("King's College London", 'K60'),
+    ('kings college london', 'K60'),
+    ('University of East Anglia', 'E14'),
+    ('Manchester University', 'M20'),
+    ('University of Manchster', 'M20'),
+    ('y50', 'Y50'),
+])
+def test_resolves(resolver, query, code):
+    assert resolver.resolve(query)[:3] == code
+
+
+@pytest.mark.parametrize('query', [
+    'University College London',
+    'Birmingham City University',
+    'Sheffield Hallam University',
+    'Imperial College',
+    'London',
+    'Z99',
+])
+def test_unknown_institutions_are_not_resolved(resolver, query):
+    assert resolver.resolve(query) is None
+
+
+def test_resolve_all_raises(resolver):
+    with pytest.raises(KeyError, match='University College London'):
+        resolver.resolve_all(['University of York', 'University College London'])
+
+
+def test_has_words():
+    name = normalise('Kings College London University of London')
+
+    assert has_words(name, normalise("King's College London"))
+    assert not has_words(name, normalise('University College London'))
+    assert not has_words(normalise('University of Birmingham'), normalise('Birmingham City University'))
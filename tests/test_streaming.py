@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+from ucas_data import clean_data, load_data
+from ucas_data.cache import read_cache
+from ucas_data.streaming import stream_clean_data
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.mark.parametrize('params', [{}, {'dropped_institutions': ('A66', 'B32')}])
+def test_stream_matches_in_memory(raw, tmp_path, params):
+    source = tmp_path / 'UCAS.csv'
+    raw.to_csv(source, index=False)
+    target = tmp_path / 'clean.feather'
+
+    # 7,000 rows split the rows of institutions across chunks
+    rows = stream_clean_data(source, target, chunksize=7_000, **params)
+    expected = clean_data(load_data(source), **params)
+
+    assert rows == len(expected)
+    pd.testing.assert_frame_equal(read_cache(target), expected.reset_index(drop=True))
@@ -0,0 +1,21 @@
+import pytest
+
+from ucas_data.synthetic import CYCLES, NAMED_INSTITUTIONS, POLAR_DIMENSIONS, shape, synthetic_data
+
+
+@pytest.mark.parametrize('scale', [0.1, 0.3, 1])
+def test_named_institutions_use_polar(scale):
+    data = synthetic_data(scale)
+    polar = data.loc[data['equality_dimension'].isin(POLAR_DIMENSIONS), 'INSTITUTION_CODE']
+
+    assert set(NAMED_INSTITUTIONS) <= set(polar.unique())
+
+
+@pytest.mark.parametrize('scale, cycles', [
+    (0.01, CYCLES),
+    (0.1, CYCLES),
+    (1, CYCLES),
+    (30, range(CYCLES.start - 7, CYCLES.stop)),
+])
+def test_cycles(scale, cycles):
+    assert shape(scale)[1] == list(cycles)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from ucas_data.trends import change_points, gap_trends, linear_trends
+
+
+@pytest.mark.parametrize('cycles', [1, 2])
+def test_gap_trends_few_cycles(clean, cycles):
+    last = sorted(clean['Cycle'].unique())[-cycles:]
+    trends = gap_trends(clean[clean['Cycle'].isin(last)])
+
+    assert len(trends) > 0
+    assert trends['change_cycle'].isna().all()
+    assert trends[['slope_before', 'slope_after', 'change_gain']].isna().all().all()
+    assert (trends['cycles'] <= cycles).all()
+    assert trends['slope'].isna().all() == (cycles == 1)
+
+
+def test_change_points_too_short():
+    position, before, after, gain = change_points(np.ones((3, 5)), np.arange(5), min_segment=3)
+
+    assert (position == -1).all()
+    assert np.isnan(before).all() and np.isnan(after).all() and np.isnan(gain).all()
+
+
+def test_step_series():
+    x = np.arange(2010, 2020)
+    step = np.where(x < 2015, 0.2, 0.1) + 0.01 * (x - 2010)
+
+    assert linear_trends(step[None], x)[0] == pytest.approx(np.polyfit(x, step, 1)[0])
+
+    position, before, after, gain = change_points(step[None], x)
+    assert x[position[0]] == 2015
+    assert before[0] == pytest.approx(0.01)
+    assert after[0] == pytest.approx(0.01)
+    assert gain[0] == pytest.approx(1)
+
+
+def test_missing_cycles_are_skipped():
+    x = np.arange(8, dtype=float)
+    y = 2 * x + 1
+    y[[2, 5]] = np.nan
+
+    valid = ~np.isnan(y)
+    assert linear_trends(y[None], x)[0] == pytest.approx(np.polyfit(x[valid], y[valid], 1)[0])
@@ -0,0 +1,79 @@
+"""Reusable building blocks for the UCAS data analysis.
+
+Submodules are imported on first access of one of their names, so that
+`python -m ucas_data` and scripts needing a single module only pay for the
+imports they use.
+"""
+
+import importlib
+import sys
+import types
+
+_EXPORTS = {
+    'instrumentation': ['Tracer', 'tracing'],
+    'loader': [
+        'DATA_PATH',
+        'SchemaError',
+        'apply_schema',
+        'concat_data',
+        'load_data',
+        'memory_report',
+        'validate_schema',
+    ],
+    'institutions': ['InstitutionIndex'],
+    'resolver': ['InstitutionResolver'],
+    'cleaning': ['CLEANING_PARAMS', 'clean_data'],
+    'streaming': ['iter_clean_chunks', 'stream_clean_data'],
+    'cache': ['cached_clean_data'],
+    'cube': ['Cube'],
+    'derive': ['RULES', 'derive', 'fill_missing'],
+    'profile': ['profile_data'],
+    'agegroup': ['AgegroupProportions', 'agegroup_proportions'],
+    'benchmarking': ['benchmark', 'write_benchmark'],
+    'charts': [
+        'offer_rate_chart',
+        'offer_rate_data',
+        'placed_applicants_chart',
+        'placed_share_data',
+    ],
+    'reports': ['render_reports'],
+    'synthetic': ['synthetic_data', 'write_synthetic'],
+    'incremental': ['CleanedStore'],
+    'trends': ['gap_series', 'gap_trends', 'rank_improvement'],
+    'store': ['AnalyticalStore', 'build_store', 'open_store'],
+    'dimensions': ['TAXONOMY', 'axis_dimensions', 'axis_gaps', 'axis_spreads', 'dimension_axes'],
+    'peers': ['find_peers', 'institution_features', 'peer_groups'],
+    'releases': ['align_releases', 'load_releases', 'revision_table'],
+    'intervals': ['offer_rate_intervals'],
+}
+
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name):
+    # exported names first: `derive` is both a submodule and its function
+    if name in _MODULES:
+        value = getattr(importlib.import_module(f'.{_MODULES[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    if name in _EXPORTS:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # importing a submodule binds it on the package: keep the exported
+        # name of the same name (`derive`) resolving to the function
+        if name in _MODULES and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
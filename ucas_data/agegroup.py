@@ -0,0 +1,92 @@
+"""Proportion of 18 year olds among all ages, per institution, cycle and statistic.
+
+The `agegroup` section of the analysis compares the `Total` counts of
+`18 year olds` with `All ages` for the absolute statistics (rates, percentages
+and per-10,000 figures are left out). Here `agegroup` is pivoted into columns
+with a single reshape instead of filtering two copies and merging them, and
+`AgegroupProportions` memoises the result per (institution set, statistics)
+and only computes the new cycle when one is appended.
+"""
+
+import pandas as pd
+
+from .institutions import InstitutionIndex
+from .instrumentation import traced
+from .loader import AGEGROUPS, STATISTICS, concat_data
+
+ABSOLUTE_STATISTICS = tuple(
+    stat for stat in STATISTICS
+    if not any(match in stat for match in ['per 10', 'rate', 'percent'])
+)
+
+KEYS = ['inst_all', 'Cycle', 'statistic']
+
+
+@traced('agegroup')
+def agegroup_proportions(data, institutions=None, statistics=ABSOLUTE_STATISTICS):
+    """`18 year olds` and `All ages` values side by side, with their ratio.
+
+    `institutions` is an optional list of institution codes. Returns one row
+    per (inst_all, Cycle, statistic) with an `All ages` row, with the columns
+    `value_18yo`, `value_all` and `18yo_proportion`.
+    """
+    selected = (data['equality_dimension'] == 'Total') & data['statistic'].isin(statistics)
+    if institutions is not None:
+        index = InstitutionIndex.from_series(data['inst_all'])
+        selected &= index.mask(data['inst_all'], institutions)
+    if not selected.any():
+        # nothing to reshape: `unstack` would not create the columns
+        empty = data.loc[selected, KEYS].reset_index(drop=True)
+        value = data['value'].iloc[:0].to_numpy()
+        return empty.assign(value_18yo=value, value_all=value, **{'18yo_proportion': value})
+
+    # `present` tells rows with a missing value from absent rows after the
+    # reshape, to keep every `All ages` row like the original right join
+    wide = (
+        data.loc[selected, [*KEYS, 'agegroup', 'value']]
+        .assign(present=True)
+        .set_index([*KEYS, 'agegroup'])
+        .unstack('agegroup')
+    )
+    wide = wide.loc[wide['present'].reindex(columns=AGEGROUPS)['All ages'].notna()]
+    values = wide['value'].reindex(columns=AGEGROUPS)
+
+    proportions = pd.DataFrame({
+        'value_18yo': values['18 year olds'],
+        'value_all': values['All ages'],
+    })
+    proportions['18yo_proportion'] = proportions['value_18yo'] / proportions['value_all']
+    return proportions.reset_index()
+
+
+class AgegroupProportions:
+    """Memoised `agegroup_proportions` over a growing dataset."""
+
+    def __init__(self, data):
+        self.data = data
+        self._results = {}
+
+    @staticmethod
+    def _key(institutions, statistics):
+        institutions = None if institutions is None else frozenset(institutions)
+        return institutions, tuple(sorted(statistics))
+
+    def get(self, institutions=None, statistics=ABSOLUTE_STATISTICS):
+        """Proportions for `institutions` and `statistics`, computed once."""
+        key = self._key(institutions, statistics)
+        if key not in self._results:
+            self._results[key] = agegroup_proportions(self.data, institutions, statistics)
+        return self._results[key]
+
+    def append_cycle(self, rows):
+        """Add the rows of new cycles and extend every memoised result with them.
+
+        Only `rows` are reshaped; the stored history is not recomputed.
+        """
+        cycles = rows['Cycle'].unique()
+        self.data = concat_data([self.data.loc[~self.data['Cycle'].isin(cycles)], rows])
+        for (institutions, statistics), result in self._results.items():
+            new = agegroup_proportions(rows, institutions, statistics)
+            self._results[institutions, statistics] = concat_data(
+                [result.loc[~result['Cycle'].isin(cycles)], new]
+            )
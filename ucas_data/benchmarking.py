@@ -0,0 +1,122 @@
+"""Peer-group benchmarking of every institution in one pass.
+
+The analysis compares University of Birmingham with five hand-picked
+universities. Here the same metrics are computed for every institution from
+the `Cube` of the cleaned data, as (institution x cycle) arrays:
+
+- `offer_rate_gap`: Q5 offer rate minus Q1 offer rate (the amplitude)
+- `placed_share_q1`: share of placed June deadline applicants from Q1
+- `placed_share_q1_q3`: share of placed June deadline applicants from Q1-Q3
+
+and each institution is compared with the mean of its own peer group through
+a single (institution x institution) membership matrix product. The product
+can be split by blocks of institutions across a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import POLAR_DIMENSIONS
+from .cube import Cube
+from .instrumentation import traced
+
+AGEGROUP = '18 year olds'
+
+METRICS = ('offer_rate_gap', 'placed_share_q1', 'placed_share_q1_q3')
+
+# the reference points and models of the analysis, as peers of UoB
+UOB_PEERS = {'B32': ('M20', 'E14', 'S18', 'K60', 'Y50')}
+
+
+def institution_metrics(cube):
+    """Benchmark metrics of every institution and cycle of `cube`.
+
+    Returns a dict of (institution x cycle) arrays, one per metric.
+    """
+    rates = cube.sel(
+        statistic='Offer rate',
+        dimension=['POLAR4 Q1', 'POLAR4 Q5'],
+        agegroup=AGEGROUP,
+    ).values
+    placed = cube.sel(
+        statistic='Placed June deadline applicants',
+        dimension=list(POLAR_DIMENSIONS),
+        agegroup=AGEGROUP,
+    ).values
+    total = placed.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'offer_rate_gap': rates[..., 1] - rates[..., 0],
+            'placed_share_q1': placed[..., 0] / total,
+            'placed_share_q1_q3': placed[..., :3].sum(axis=-1) / total,
+        }
+
+
+def peer_matrix(institutions, peers):
+    """Membership matrix of `peers`, a mapping of institution code to peer codes.
+
+    Row i has a 1 for every peer of institution i; unknown codes are ignored.
+    """
+    codes = pd.Index(pd.Index(institutions).str[:3])
+    matrix = np.zeros((len(codes), len(codes)), dtype=np.float32)
+    for code, group in peers.items():
+        i = codes.get_indexer([code])[0]
+        if i < 0:
+            continue
+        j = codes.get_indexer(list(group))
+        matrix[i, j[(j >= 0) & (j != i)]] = 1
+    return matrix
+
+
+def _peer_means(matrix, values):
+    """Mean of each row's peers in `values`, ignoring missing values."""
+    valid = ~np.isnan(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (matrix @ np.where(valid, values, 0)) / (matrix @ valid)
+
+
+def peer_means(matrix, values, workers=None):
+    """`_peer_means`, split by blocks of rows across `workers` processes."""
+    if not workers or workers < 2:
+        return _peer_means(matrix, values)
+    blocks = np.array_split(matrix, workers)
+    with ProcessPoolExecutor(workers) as pool:
+        return np.concatenate(list(pool.map(_peer_means, blocks, [values] * len(blocks))))
+
+
+@traced('benchmark')
+def benchmark(data, peers, workers=None):
+    """Benchmark metrics of every institution against its peer group.
+
+    `data` is the cleaned data and `peers` maps institution codes to the
+    codes of their peers. Returns one row per (inst_all, Cycle) with each
+    metric, the mean of the institution's peers (`peer_<metric>`) and the
+    difference between the two (`<metric>_vs_peers`).
+    """
+    cube = Cube.from_frame(data)
+    institutions = cube.coords['inst']
+    cycles = cube.coords['cycle']
+    metrics = institution_metrics(cube)
+    matrix = peer_matrix(institutions, peers)
+
+    stacked = np.concatenate([metrics[name] for name in METRICS], axis=1)
+    means = np.split(peer_means(matrix, stacked, workers), len(METRICS), axis=1)
+
+    results = pd.DataFrame(
+        index=pd.MultiIndex.from_product([institutions, cycles], names=['inst_all', 'Cycle'])
+    )
+    for name, mean in zip(METRICS, means):
+        results[name] = metrics[name].ravel()
+        results[f'peer_{name}'] = mean.ravel()
+        results[f'{name}_vs_peers'] = results[name] - results[f'peer_{name}']
+    results['peer_count'] = np.repeat(matrix.sum(axis=1).astype(int), len(cycles))
+    return results.reset_index()
+
+
+def write_benchmark(data, peers, path, workers=None):
+    """Write the `benchmark` table of all institutions to the CSV file `path`."""
+    results = benchmark(data, peers, workers)
+    results.to_csv(path, index=False)
+    return results
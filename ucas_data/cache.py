@@ -0,0 +1,107 @@
+"""Columnar on-disk cache of the cleaned dataset.
+
+The cleaned frame is stored as an uncompressed Arrow IPC (Feather v2) file,
+named after a hash of the source CSV and the cleaning parameters. Loading it
+back memory-maps the file, so a warm start costs a single file map instead
+of a CSV parse plus cleaning. Requires `pyarrow`.
+"""
+
+import hashlib
+import json
+import re
+from pathlib import Path
+
+from .cleaning import CLEANING_PARAMS, clean_data
+from .instrumentation import traced
+from .loader import DATA_PATH, load_data
+from .streaming import stream_clean_data
+
+CACHE_DIR = './.ucas_cache'
+
+_CHUNK_SIZE = 1 << 20
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise ImportError('the cleaned data cache requires pyarrow') from e
+    return feather
+
+
+def file_hash(path):
+    """SHA-256 of the bytes of `path`."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_hash(params=None):
+    """SHA-256 of the cleaning `params`, completed with the defaults."""
+    params = {**CLEANING_PARAMS, **(params or {})}
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True, default=list).encode()
+    ).hexdigest()
+
+
+def cache_path(path=DATA_PATH, cache_dir=CACHE_DIR, **params):
+    """Location of the cache file for `path` cleaned with `params`."""
+    stem = Path(path).stem
+    return Path(cache_dir) / f'{stem}-{file_hash(path)[:16]}-{params_hash(params)[:8]}.feather'
+
+
+@traced('cache.write')
+def write_cache(data, target):
+    """Write `data` to `target` atomically as uncompressed Feather."""
+    feather = _require_pyarrow()
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix('.tmp')
+    feather.write_feather(data, tmp, compression='uncompressed')
+    tmp.replace(target)
+
+
+@traced('cache.read')
+def read_cache(target):
+    """Memory-map a cache file written by `write_cache`."""
+    feather = _require_pyarrow()
+    return feather.read_table(target, memory_map=True).to_pandas()
+
+
+@traced('cache.cached_clean_data')
+def cached_clean_data(
+    path=DATA_PATH,
+    cache_dir=CACHE_DIR,
+    rebuild=False,
+    chunksize=None,
+    **params,
+):
+    """Cleaned data for `path`, rebuilt only when the source or `params` change.
+
+    With `chunksize`, the cache is built by streaming the source in chunks of
+    that many rows (see `stream_clean_data`) instead of loading it whole.
+
+    Cache files built from a previous version of the source are removed when
+    a new one is written.
+    """
+    target = cache_path(path, cache_dir, **params)
+    if target.exists() and not rebuild:
+        return read_cache(target)
+
+    # only caches of this exact source: `UCAS-*` also matches `UCAS-2022-*`
+    name = re.compile(rf'{re.escape(Path(path).stem)}-([0-9a-f]{{16}})-[0-9a-f]{{8}}')
+    source_hash = name.fullmatch(target.stem)[1]
+    for stale in target.parent.glob('*.feather'):
+        match = name.fullmatch(stale.stem)
+        if match and match[1] != source_hash:
+            stale.unlink()
+
+    if chunksize:
+        stream_clean_data(path, target, chunksize, **params)
+        return read_cache(target)
+
+    data = clean_data(load_data(path), **params)
+    write_cache(data, target)
+    return data
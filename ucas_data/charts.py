@@ -0,0 +1,138 @@
+"""The faceted Altair charts of the analysis.
+
+Altair serialises every row and column of the frame it is given into the
+chart spec. The charts are therefore built from prepared frames that only
+hold the encoded fields, with one row per plotted point, and the `stack=
+'normalize'` shares of the placed applicants are computed here rather than
+in the browser. With `data_dir`, the prepared data is written to a JSON file
+that the spec references by URL instead of embedding it.
+
+`altair` is only imported when a chart is built, so the rest of the package
+can be used without it.
+"""
+
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+FIELDS = ['inst_all', 'Cycle', 'equality_dimension', 'value']
+
+TITLE = {
+    'anchor': 'middle',
+    'fontSize': 15,
+    'dy': -10,
+}
+
+
+def _require_altair():
+    try:
+        import altair as alt
+    except ImportError as e:
+        raise ImportError('charts require altair') from e
+    return alt
+
+
+def _chart_data(data, statistic):
+    """Rows of `statistic` projected to the encoded fields, one per point."""
+    selected = data.loc[data['statistic'] == statistic, FIELDS]
+    points = selected.groupby(FIELDS[:-1], observed=True, as_index=False)['value'].mean()
+    # altair requires datetime column for plotting time series
+    points['Cycle'] = pd.to_datetime(points['Cycle'].astype(str), format='%Y')
+    return points
+
+
+def offer_rate_data(data):
+    """Offer rates by institution, cycle and POLAR4 quintile."""
+    return _chart_data(data, 'Offer rate')
+
+
+def placed_share_data(data):
+    """Placed June deadline applicants with their share of the institution-cycle total."""
+    points = _chart_data(data, 'Placed June deadline applicants')
+    totals = points.groupby(['inst_all', 'Cycle'], observed=True)['value'].transform('sum')
+    points['share'] = points['value'] / totals
+    return points
+
+
+def _source(alt, points, name, data_dir=None, data_url=None):
+    """Inline `points`, or write them to `data_dir` and reference them by URL.
+
+    The file name includes a hash of the content, so charts of different
+    institutions never overwrite each other's data. `data_url` is the URL of
+    `data_dir` as seen from the chart (default: `data_dir` itself).
+    """
+    if data_dir is None:
+        return points
+    content = points.to_json(orient='records', date_format='iso')
+    filename = f'{name}-{hashlib.sha1(content.encode()).hexdigest()[:12]}.json'
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    (data_dir / filename).write_text(content)
+    base = str(data_dir) if data_url is None else data_url
+    return alt.UrlData(url=f"{base.rstrip('/')}/{filename}", format=alt.DataFormat(type='json'))
+
+
+def _facet(alt, chart, title, order):
+    # altair requires a list of labels to sort faceted charts
+    return chart.facet(
+        facet=alt.Facet('inst_all:N', title=None, sort=order),
+        columns=2,
+        title={'text': title, **TITLE},
+    )
+
+
+def _cycles(data):
+    return f"{data['Cycle'].min()}-{data['Cycle'].max()}"
+
+
+def _order(data, order):
+    return order or sorted(data['inst_all'].unique())
+
+
+def offer_rate_chart(data, order=None, data_dir=None, data_url=None):
+    """Offer rates by POLAR4 quintile, one line chart per university."""
+    alt = _require_altair()
+    source = _source(alt, offer_rate_data(data), 'offer_rate', data_dir, data_url)
+    chart = alt.Chart(source)\
+    .mark_line(point=True)\
+    .encode(
+        x=alt.X('Cycle:T', title='Year'),
+        y=alt.Y('value:Q', title='Offer rate'),
+        color=alt.Color('equality_dimension:N', title='POLAR4'),
+        tooltip=(
+            alt.Tooltip('inst_all:N', title='University'),
+            alt.Tooltip('equality_dimension:N', title='POLAR4'),
+            alt.Tooltip('value:Q', title='Offer rate'),
+        )
+    )
+    return _facet(alt, chart, f'Offer rate in {_cycles(data)} by university', _order(data, order))
+
+
+def placed_applicants_chart(data, order=None, data_dir=None, data_url=None):
+    """Shares of placed June deadline applicants by POLAR4 quintile, one stacked area chart per university."""
+    alt = _require_altair()
+    source = _source(alt, placed_share_data(data), 'placed_applicants', data_dir, data_url)
+    chart = alt.Chart(source)\
+    .mark_area(opacity=.8, stroke='white', strokeWidth=2)\
+    .encode(
+        x=alt.X('Cycle:T', title='Year'),
+        y=alt.Y(
+            'share:Q',
+            title='Placed June deadline applicants (percentage)',
+            stack=True,
+            axis=alt.Axis(format='%'),
+        ),
+        color=alt.Color('equality_dimension:N', title='POLAR4'),
+        tooltip=(
+            alt.Tooltip('inst_all:N', title='University'),
+            alt.Tooltip('equality_dimension:N', title='POLAR4'),
+            alt.Tooltip('value:Q', title='Placed June deadline applicants'),
+        )
+    )
+    return _facet(
+        alt,
+        chart,
+        f'Placed June deadline applicants in {_cycles(data)} by university',
+        _order(data, order),
+    )
@@ -0,0 +1,62 @@
+"""The "Data cleaning" section of the analysis as a reusable function."""
+
+from .dimensions import axis_dimensions
+from .institutions import InstitutionIndex
+from .instrumentation import traced
+from .loader import SchemaError
+
+# institutions missing all values for the first cycles of the dataset
+DROPPED_INSTITUTIONS = ('A66', 'W01', 'W05')
+
+# we only focus on 18 year olds (see the `agegroup` section of the analysis)
+DROPPED_AGEGROUPS = ('All ages',)
+
+POLAR_DIMENSIONS = axis_dimensions('polar')
+
+CLEANING_PARAMS = {
+    'dropped_institutions': DROPPED_INSTITUTIONS,
+    'dropped_agegroups': DROPPED_AGEGROUPS,
+    'dimensions': POLAR_DIMENSIONS,
+}
+
+
+@traced('clean.check_institution_code')
+def check_institution_code(data):
+    """Check that `INSTITUTION_CODE` is the code prefix of `inst_all`."""
+    if 'INSTITUTION_CODE' not in data.columns:
+        return
+    institutions = InstitutionIndex.from_series(data['inst_all'])
+    if not institutions.check_codes(data['inst_all'], data['INSTITUTION_CODE']):
+        raise SchemaError('INSTITUTION_CODE does not match the prefix of inst_all')
+
+
+@traced('clean.filter_rows')
+def filter_rows(
+    data,
+    dropped_institutions=DROPPED_INSTITUTIONS,
+    dropped_agegroups=DROPPED_AGEGROUPS,
+    dimensions=POLAR_DIMENSIONS,
+):
+    """Apply the row filters of the cleaning pipeline to `data`."""
+    institutions = InstitutionIndex.from_series(data['inst_all'])
+    return data.loc[
+        ~institutions.mask(data['inst_all'], dropped_institutions)
+        & ~data['agegroup'].isin(dropped_agegroups)
+        & data['equality_dimension'].isin(dimensions)
+    ]
+
+
+@traced('clean')
+def clean_data(data, **params):
+    """Clean a frame returned by `load_data`.
+
+    Checks and drops `INSTITUTION_CODE`, drops the institutions with missing
+    cycles, the `All ages` rows and every non-POLAR `equality_dimension`.
+    Keyword arguments override the defaults in `CLEANING_PARAMS`.
+    """
+    params = {**CLEANING_PARAMS, **params}
+    check_institution_code(data)
+    data = filter_rows(data.drop(columns='INSTITUTION_CODE', errors='ignore'), **params)
+    data = data.reset_index(drop=True)
+    data['inst_all'] = data['inst_all'].cat.remove_unused_categories()
+    return data
@@ -0,0 +1,355 @@
+"""Command-line entry point of the analysis pipeline.
+
+    python -m ucas_data clean    [--output data_clean.feather]
+    python -m ucas_data profile  [--output profile.json]
+    python -m ucas_data metrics  [--peers peers.json] [--output metrics.csv]
+    python -m ucas_data charts   [--institutions B32 M20 ...] [--output-dir charts]
+    python -m ucas_data reports  [--peers peers.json] [--workers 4] [--output-dir reports]
+    python -m ucas_data trends   [--low 'POLAR4 Q1'] [--high 'POLAR4 Q5'] [--output trends.csv]
+    python -m ucas_data peers    [--institutions B32 ...] [--k 5] [--output peers.json]
+    python -m ucas_data gaps     [--spreads] [--output gaps.csv]
+    python -m ucas_data query    [--institutions B32 ...] [--statistics 'Offer rate' ...] [--output slice.csv]
+    python -m ucas_data releases releases/ [--workers 4] [--output revisions.csv]
+    python -m ucas_data intervals [--method bootstrap] [--rates-output rate_intervals.csv] [--output gap_intervals.csv]
+    python -m ucas_data resolve  "King's College London" Y50 ...
+    python -m ucas_data append   [--store store] [--replace] new_cycle.csv ...
+
+Every command imports what it needs when it runs (the package itself
+imports its submodules lazily): only `charts` loads the plotting libraries,
+so the other commands start as fast as pandas does.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _cleaned(args):
+    from .cache import cached_clean_data
+
+    return cached_clean_data(
+        args.data,
+        args.cache_dir,
+        rebuild=args.rebuild,
+        chunksize=args.chunksize,
+    )
+
+
+def _loaded(args):
+    from .loader import load_data
+
+    return load_data(args.data)
+
+
+def _write_frame(data, path):
+    path = Path(path)
+    if path.suffix == '.feather':
+        from .cache import write_cache
+
+        write_cache(data, path)
+    elif path.suffix == '.parquet':
+        data.to_parquet(path, index=False)
+    else:
+        data.to_csv(path, index=False)
+
+
+def clean(args):
+    data = _cleaned(args)
+    if args.output:
+        _write_frame(data, args.output)
+    print(f'{len(data)} cleaned rows', file=sys.stderr)
+
+
+def profile(args):
+    from .profile import profile_data
+
+    data = _cleaned(args) if args.cleaned else _loaded(args)
+    report = json.dumps(profile_data(data), indent=2)
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report)
+
+
+def metrics(args):
+    from .benchmarking import UOB_PEERS, benchmark
+
+    peers = json.loads(Path(args.peers).read_text()) if args.peers else UOB_PEERS
+    results = benchmark(_cleaned(args), peers, workers=args.workers)
+    results.to_csv(args.output or sys.stdout, index=False)
+
+
+def charts(args):
+    from .charts import offer_rate_chart, placed_applicants_chart
+    from .institutions import InstitutionIndex
+    from .resolver import InstitutionResolver
+
+    data = _cleaned(args)
+    institutions = InstitutionIndex.from_series(data['inst_all'])
+    codes = InstitutionResolver(institutions).codes_for(args.institutions)
+    data = data.loc[institutions.mask(data['inst_all'], codes)]
+    order = institutions.labels_for(codes)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # external data is referenced relative to the HTML files
+    external = {'data_dir': output_dir / 'data', 'data_url': 'data'} if args.external_data else {}
+    offer_rate_chart(data, order, **external).save(str(output_dir / 'offer_rate.html'))
+    placed_applicants_chart(data, order, **external).save(
+        str(output_dir / 'placed_applicants.html')
+    )
+
+
+def reports(args):
+    from .benchmarking import UOB_PEERS
+    from .cache import cache_path
+    from .reports import render_reports
+
+    _cleaned(args)
+    peers = json.loads(Path(args.peers).read_text()) if args.peers else UOB_PEERS
+    stats = render_reports(
+        cache_path(args.data, args.cache_dir),
+        peers,
+        args.output_dir,
+        workers=args.workers,
+        formats=args.formats,
+    )
+    print(json.dumps(stats), file=sys.stderr)
+
+
+def trends(args):
+    from .trends import gap_trends, rank_improvement
+
+    ranked = rank_improvement(gap_trends(_cleaned(args)), args.low, args.high, by=args.by)
+    ranked.to_csv(args.output or sys.stdout, index=False)
+
+
+def peers(args):
+    from .peers import find_peers, peer_groups
+
+    found = find_peers(
+        _cleaned(args),
+        k=args.k,
+        institutions=args.institutions,
+        cycles=args.cycles,
+        block_size=args.block_size,
+    )
+    # the JSON mapping is the --peers input of `metrics` and `reports`
+    groups = json.dumps(peer_groups(found), indent=2)
+    if args.output:
+        Path(args.output).write_text(groups)
+    else:
+        print(groups)
+
+
+def gaps(args):
+    from .dimensions import axis_gaps, axis_spreads
+
+    compute = axis_spreads if args.spreads else axis_gaps
+    results = compute(_loaded(args), statistic=args.statistic)
+    results.to_csv(args.output or sys.stdout, index=False)
+
+
+def query(args):
+    from .store import open_store
+
+    path = args.store or Path(args.cache_dir) / 'ucas.sqlite'
+    with open_store(args.data, path, rebuild=args.rebuild) as store:
+        data = store.query(
+            institutions=args.institutions,
+            cycles=args.cycles,
+            statistics=args.statistics,
+            dimensions=args.dimensions,
+            agegroups=args.agegroups,
+        )
+    if args.output:
+        _write_frame(data, args.output)
+    else:
+        data.to_csv(sys.stdout, index=False)
+
+
+def releases(args):
+    from .releases import load_releases, revision_table
+
+    revisions = revision_table(
+        load_releases(args.directory, args.pattern, workers=args.workers),
+        atol=args.atol,
+    )
+    revisions.to_csv(args.output or sys.stdout, index=False)
+    print(f'{len(revisions)} changed cells', file=sys.stderr)
+
+
+def intervals(args):
+    from .intervals import offer_rate_intervals
+
+    rates, gaps = offer_rate_intervals(
+        _cleaned(args),
+        method=args.method,
+        alpha=args.alpha,
+        draws=args.draws,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    if args.rates_output:
+        rates.to_csv(args.rates_output, index=False)
+    gaps.to_csv(args.output or sys.stdout, index=False)
+
+
+def resolve(args):
+    from .resolver import InstitutionResolver
+
+    resolver = InstitutionResolver.from_series(_cleaned(args)['inst_all'])
+    for query in args.queries:
+        print(f'{query}\t{resolver.resolve(query) or ""}')
+
+
+def append(args):
+    from .benchmarking import UOB_PEERS
+    from .incremental import CleanedStore
+    from .loader import load_data
+
+    store = CleanedStore(args.store)
+    for path in args.files:
+        if store.cycles:
+            written = store.append_cycle(path, replace=args.replace)
+        else:
+            peers = json.loads(Path(args.peers).read_text()) if args.peers else UOB_PEERS
+            written = store.build(load_data(path), peers)
+        print(f'{path}: {json.dumps(written)}', file=sys.stderr)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='ucas_data', description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='./UCAS_data_file.csv', help='UCAS data file')
+    parser.add_argument('--cache-dir', default='./.ucas_cache', help='cleaned data cache')
+    parser.add_argument('--rebuild', action='store_true', help='rebuild the cleaned data cache')
+    parser.add_argument(
+        '--chunksize',
+        type=int,
+        help='clean the data file in chunks of this many rows',
+    )
+    parser.add_argument('--trace', help='write a JSON trace of the pipeline stages')
+    parser.add_argument('--chrome-trace', help='write the trace in the Chrome trace format')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('clean', help='build the cleaned data cache')
+    command.add_argument('--output', help='also write the cleaned data (.feather, .parquet or .csv)')
+    command.set_defaults(func=clean)
+
+    command = commands.add_parser('profile', help='data-quality profile as JSON')
+    command.add_argument('--cleaned', action='store_true', help='profile the cleaned data')
+    command.add_argument('--output', help='JSON file (default: stdout)')
+    command.set_defaults(func=profile)
+
+    command = commands.add_parser('metrics', help='peer-group benchmark of all institutions')
+    command.add_argument('--peers', help='JSON mapping of institution code to peer codes')
+    command.add_argument('--workers', type=int, help='processes for the peer comparison')
+    command.add_argument('--output', help='CSV file (default: stdout)')
+    command.set_defaults(func=metrics)
+
+    command = commands.add_parser('charts', help='faceted offer rate and placed applicants charts')
+    command.add_argument(
+        '--institutions',
+        nargs='+',
+        default=['B32', 'M20', 'E14', 'S18', 'K60', 'Y50'],
+        help='codes or names of the institutions to plot',
+    )
+    command.add_argument('--output-dir', default='.', help='directory of the HTML charts')
+    command.add_argument(
+        '--external-data',
+        action='store_true',
+        help='write chart data to JSON files next to the charts instead of embedding it',
+    )
+    command.set_defaults(func=charts)
+
+    command = commands.add_parser('reports', help='chart reports of institutions and their peers')
+    command.add_argument('--peers', help='JSON mapping of institution code to peer codes')
+    command.add_argument('--workers', type=int, help='rendering processes')
+    command.add_argument('--formats', nargs='+', default=['html'], help='chart formats')
+    command.add_argument('--output-dir', default='reports', help='directory of the reports')
+    command.set_defaults(func=reports)
+
+    command = commands.add_parser('trends', help='institutions ranked by the trend of an offer rate gap')
+    command.add_argument('--low', default='POLAR4 Q1', help='lower quintile of the gap')
+    command.add_argument('--high', default='POLAR4 Q5', help='higher quintile of the gap')
+    command.add_argument(
+        '--by',
+        default='slope',
+        choices=['slope', 'slope_after', 'last_gap'],
+        help='column to rank by, smallest first',
+    )
+    command.add_argument('--output', help='CSV file (default: stdout)')
+    command.set_defaults(func=trends)
+
+    command = commands.add_parser('peers', help='peer groups of institutions with similar profiles')
+    command.add_argument('--institutions', nargs='+', help='institution codes (default: all)')
+    command.add_argument('--k', type=int, default=5, help='number of peers per institution')
+    command.add_argument('--cycles', nargs='+', type=int, help='cycles of the profiles (default: all)')
+    command.add_argument('--block-size', type=int, help='compute distances for this many institutions at a time')
+    command.add_argument('--output', help='JSON file (default: stdout)')
+    command.set_defaults(func=peers)
+
+    command = commands.add_parser('gaps', help='gaps between the groups of every equality axis')
+    command.add_argument('--statistic', default='Offer rate', help='statistic to compare')
+    command.add_argument('--spreads', action='store_true', help='one row per axis: highest minus lowest group')
+    command.add_argument('--output', help='CSV file (default: stdout)')
+    command.set_defaults(func=gaps)
+
+    command = commands.add_parser('query', help='slice of the untrimmed data from the SQLite store')
+    command.add_argument('--institutions', nargs='+', help='institution codes or inst_all values')
+    command.add_argument('--cycles', nargs='+', type=int, help='cycles')
+    command.add_argument('--statistics', nargs='+', help='statistics')
+    command.add_argument('--dimensions', nargs='+', help='equality dimensions')
+    command.add_argument('--agegroups', nargs='+', help='agegroups')
+    command.add_argument('--store', help='SQLite store (default: in the cache directory)')
+    command.add_argument('--output', help='.feather, .parquet or .csv file (default: CSV on stdout)')
+    command.set_defaults(func=query)
+
+    command = commands.add_parser('releases', help='cells revised between UCAS releases')
+    command.add_argument('directory', help='directory of release files, ordered by name')
+    command.add_argument('--pattern', default='*.csv', help='release file pattern')
+    command.add_argument('--workers', type=int, help='parsing processes')
+    command.add_argument('--atol', type=float, default=0.0, help='ignore changes up to this value')
+    command.add_argument('--output', help='CSV file (default: stdout)')
+    command.set_defaults(func=releases)
+
+    command = commands.add_parser('intervals', help='confidence intervals of offer rates and Q5-Q1 gaps')
+    command.add_argument('--method', default='wilson', choices=['wilson', 'bootstrap'], help='interval method')
+    command.add_argument('--alpha', type=float, default=0.05, help='1 - confidence level')
+    command.add_argument('--draws', type=int, default=2000, help='bootstrap resamples')
+    command.add_argument('--seed', type=int, default=0, help='bootstrap seed')
+    command.add_argument('--workers', type=int, help='bootstrap processes')
+    command.add_argument('--rates-output', help='CSV file of the offer rate intervals')
+    command.add_argument('--output', help='CSV file of the gap intervals (default: stdout)')
+    command.set_defaults(func=intervals)
+
+    command = commands.add_parser('resolve', help='inst_all values of institution names or codes')
+    command.add_argument('queries', nargs='+', help='institution names or codes')
+    command.set_defaults(func=resolve)
+
+    command = commands.add_parser('append', help='add new cycles to a cycle-partitioned store')
+    command.add_argument('files', nargs='+', help='UCAS data files of the new cycles')
+    command.add_argument('--store', default='store', help='directory of the store')
+    command.add_argument('--replace', action='store_true', help='replace cycles already stored')
+    command.add_argument('--peers', help='JSON mapping of institution code to peer codes, for a new store')
+    command.set_defaults(func=append)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.trace or args.chrome_trace):
+        args.func(args)
+        return 0
+
+    from .instrumentation import tracing
+
+    with tracing() as tracer:
+        args.func(args)
+    if args.trace:
+        tracer.write_json(args.trace)
+    if args.chrome_trace:
+        tracer.write_chrome_trace(args.chrome_trace)
+    return 0
@@ -0,0 +1,164 @@
+"""Dense N-dimensional representation of the long UCAS table.
+
+The long table is pivoted once into a `float32` array indexed by
+institution, cycle, equality dimension, statistic and agegroup, with a
+boolean mask of the cells that hold a value. Selections and aggregations are
+then array slices and reductions rather than boolean scans of every row:
+
+    cube = Cube.from_frame(data)
+    cube.sel(inst=['B32', 'M20'], statistic='Offer rate').to_frame()
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import traced
+
+DIMS = ('inst', 'cycle', 'dimension', 'statistic', 'agegroup')
+
+COLUMNS = {
+    'inst': 'inst_all',
+    'cycle': 'Cycle',
+    'dimension': 'equality_dimension',
+    'statistic': 'statistic',
+    'agegroup': 'agegroup',
+}
+
+_REDUCTIONS = {
+    'sum': np.nansum,
+    'mean': np.nanmean,
+    'min': np.nanmin,
+    'max': np.nanmax,
+}
+
+
+def _factorize(series):
+    """Codes and observed labels of `series`, labels in category/sorted order."""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = pd.factorize(series, sort=True)
+        return codes, pd.Index(labels)
+    codes = series.cat.codes.to_numpy()
+    categories = series.cat.categories
+    used = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+    # missing values keep the code -1
+    remap = np.append(np.cumsum(used) - 1, -1)
+    return remap[codes], categories[used]
+
+
+class Cube:
+    """Values and validity mask over labelled dimensions."""
+
+    def __init__(self, values, mask, coords, dims=DIMS):
+        self.values = values
+        self.mask = mask
+        self.coords = dict(coords)
+        self.dims = tuple(dims)
+
+    @classmethod
+    @traced('cube')
+    def from_frame(cls, data, value='value'):
+        """Build the cube of a long frame with the cleaned data's columns.
+
+        Only labels present in `data` become coordinates; duplicated cells
+        raise a `ValueError`.
+        """
+        dims = [dim for dim in DIMS if COLUMNS[dim] in data.columns]
+        codes, coords = [], {}
+        for dim in dims:
+            dim_codes, coords[dim] = _factorize(data[COLUMNS[dim]])
+            codes.append(dim_codes)
+        shape = tuple(len(coords[dim]) for dim in dims)
+
+        flat = np.ravel_multi_index(codes, shape)
+        if (np.bincount(flat, minlength=int(np.prod(shape))) > 1).any():
+            raise ValueError('data has more than one row per cell')
+
+        values = np.full(shape, np.nan, dtype=np.float32)
+        values.flat[flat] = data[value].to_numpy(dtype=np.float32, na_value=np.nan)
+        return cls(values, ~np.isnan(values), coords, dims)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def sizes(self):
+        return dict(zip(self.dims, self.shape))
+
+    def __repr__(self):
+        sizes = ', '.join(f'{dim}: {size}' for dim, size in self.sizes.items())
+        return f'<Cube ({sizes}), {int(self.mask.sum())} cells with values>'
+
+    def _positions(self, dim, labels):
+        coords = self.coords[dim]
+        positions = coords.get_indexer(labels)
+        if dim == 'inst' and (positions < 0).any():
+            # institutions can also be selected by their code
+            by_code = pd.Index(coords.str[:3]).get_indexer(labels)
+            positions = np.where(positions < 0, by_code, positions)
+        if (positions < 0).any():
+            missing = [label for label, pos in zip(labels, positions) if pos < 0]
+            raise KeyError(f'{missing} not in {dim}')
+        return positions
+
+    def sel(self, **indexers):
+        """Select by label along any dimension.
+
+        A scalar label drops the dimension, a list keeps it. Selecting a
+        scalar on every dimension returns the value (NaN when missing).
+        """
+        unknown = set(indexers) - set(self.dims)
+        if unknown:
+            raise KeyError(f'unknown dimensions: {sorted(unknown)}')
+
+        index, dims, coords = [], [], {}
+        for dim in self.dims:
+            if dim not in indexers:
+                index.append(slice(None))
+                dims.append(dim)
+                coords[dim] = self.coords[dim]
+                continue
+            labels = indexers[dim]
+            if np.ndim(labels) == 0:
+                index.append(self._positions(dim, [labels])[0])
+            else:
+                positions = self._positions(dim, list(labels))
+                index.append(positions)
+                dims.append(dim)
+                coords[dim] = self.coords[dim][positions]
+
+        # index one dimension at a time: mixing arrays would broadcast them
+        values, mask = self.values, self.mask
+        for axis, key in reversed(list(enumerate(index))):
+            selector = (slice(None),) * axis + (key,)
+            values, mask = values[selector], mask[selector]
+        if not dims:
+            return float(values)
+        return Cube(values, mask, coords, dims)
+
+    def reduce(self, dim, how='sum'):
+        """Aggregate over `dim` with `how` (sum, mean, min or max), ignoring missing cells."""
+        axis = self.dims.index(dim)
+        mask = self.mask.any(axis=axis)
+        with warnings.catch_warnings():
+            # all-missing slices are expected and are masked out below
+            warnings.simplefilter('ignore', RuntimeWarning)
+            values = _REDUCTIONS[how](np.where(self.mask, self.values, np.nan), axis=axis)
+        values = np.where(mask, values, np.nan).astype(np.float32)
+        dims = [d for d in self.dims if d != dim]
+        return Cube(values, mask, {d: self.coords[d] for d in dims}, dims)
+
+    def to_frame(self, value='value'):
+        """Long frame of the cells with values, with the cleaned data's columns."""
+        positions = np.nonzero(self.mask)
+        columns = {}
+        for dim, pos in zip(self.dims, positions):
+            coords = self.coords[dim]
+            if dim == 'cycle':
+                columns[COLUMNS[dim]] = coords[pos].to_numpy()
+            else:
+                columns[COLUMNS[dim]] = pd.Categorical.from_codes(pos, categories=coords)
+        columns[value] = self.values[positions]
+        return pd.DataFrame(columns)
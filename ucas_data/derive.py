@@ -0,0 +1,134 @@
+"""Fill missing statistics from the identities that link them.
+
+The missing `value` cells are limited to the rate statistics, which can be
+derived from other statistics of the same (institution, cycle, dimension,
+agegroup) cell:
+
+- Offer rate = Offers / June deadline applicants
+- Percentage point difference = (Offer rate - Average offer rate) * 100
+
+Each identity is declared as a `Rule`; `derive` applies them to a `Cube`
+along its `statistic` axis, so every cell of a statistic is computed at once.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .cube import Cube
+from .instrumentation import traced
+
+OFFER_RATE = 'Offer rate'
+AVERAGE_OFFER_RATE = 'Average offer rate'
+PP_DIFFERENCE = 'Percentage point difference between offer rate and average offer rate'
+
+Rule = namedtuple('Rule', ['name', 'target', 'inputs', 'func', 'atol'])
+Rule.__doc__ = """Derivation of statistic `target` from the statistics `inputs`.
+
+`func` takes one array per input, `atol` is the absolute tolerance used to
+flag observed values that disagree with the derived ones (published values
+are rounded).
+"""
+
+RULES = [
+    Rule(
+        'Offer rate = Offers / June deadline applicants',
+        OFFER_RATE,
+        ('Offers', 'June deadline applicants'),
+        lambda offers, applicants: offers / applicants,
+        0.01,
+    ),
+    Rule(
+        'Offer rate = Average offer rate + pp difference / 100',
+        OFFER_RATE,
+        (AVERAGE_OFFER_RATE, PP_DIFFERENCE),
+        lambda average, difference: average + difference / 100,
+        0.002,
+    ),
+    Rule(
+        'Average offer rate = Offer rate - pp difference / 100',
+        AVERAGE_OFFER_RATE,
+        (OFFER_RATE, PP_DIFFERENCE),
+        lambda rate, difference: rate - difference / 100,
+        0.002,
+    ),
+    Rule(
+        'pp difference = (Offer rate - Average offer rate) * 100',
+        PP_DIFFERENCE,
+        (OFFER_RATE, AVERAGE_OFFER_RATE),
+        lambda rate, average: (rate - average) * 100,
+        0.2,
+    ),
+]
+
+
+def _applicable(rule, statistics):
+    return all(stat in statistics for stat in (rule.target, *rule.inputs))
+
+
+def _evaluate(rule, values, mask, axis, statistics):
+    """Derived target values of `rule` and where they could be computed."""
+    positions = statistics.get_indexer(rule.inputs)
+    inputs = [values.take(pos, axis=axis) for pos in positions]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        computed = rule.func(*inputs)
+    valid = np.logical_and.reduce([mask.take(pos, axis=axis) for pos in positions])
+    return computed, valid & np.isfinite(computed)
+
+
+@traced('derive')
+def derive(cube, rules=RULES, max_passes=5):
+    """Fill the missing cells of `cube` that `rules` can derive.
+
+    Rules are applied repeatedly until no more cells are recovered, so a
+    value derived by one rule can feed another. Observed values are checked
+    against each rule beforehand. Returns the filled cube and a report with,
+    per rule, the number of cells recovered and of observed cells that are
+    inconsistent with the rule.
+    """
+    axis = cube.dims.index('statistic')
+    statistics = cube.coords['statistic']
+    rules = [rule for rule in rules if _applicable(rule, statistics)]
+    values, mask = cube.values.copy(), cube.mask.copy()
+
+    report = pd.DataFrame(
+        0,
+        index=pd.Index([rule.name for rule in rules], name='rule'),
+        columns=['recovered', 'inconsistent'],
+    )
+
+    for rule in rules:
+        computed, valid = _evaluate(rule, values, mask, axis, statistics)
+        target = statistics.get_loc(rule.target)
+        observed = values.take(target, axis=axis)
+        checked = valid & mask.take(target, axis=axis)
+        report.loc[rule.name, 'inconsistent'] = int(
+            (checked & ~np.isclose(computed, observed, rtol=0, atol=rule.atol)).sum()
+        )
+
+    for _ in range(max_passes):
+        recovered = 0
+        for rule in rules:
+            computed, valid = _evaluate(rule, values, mask, axis, statistics)
+            index = [slice(None)] * values.ndim
+            index[axis] = statistics.get_loc(rule.target)
+            index = tuple(index)
+            fill = valid & ~mask[index]
+            values[index] = np.where(fill, computed, values[index])
+            mask[index] |= fill
+            report.loc[rule.name, 'recovered'] += int(fill.sum())
+            recovered += int(fill.sum())
+        if not recovered:
+            break
+
+    return Cube(values, mask, cube.coords, cube.dims), report
+
+
+def fill_missing(data, rules=RULES):
+    """Long-frame version of `derive`: returns the filled frame and the report.
+
+    Cells that are still missing after derivation are left out of the frame.
+    """
+    cube, report = derive(Cube.from_frame(data), rules)
+    return cube.to_frame(), report
@@ -0,0 +1,166 @@
+"""Taxonomy of the `equality_dimension` values and per-axis gaps.
+
+Every `equality_dimension` value belongs to one axis (POLAR4 and SIMD
+quintiles, ethnicity, sex) and names a group on it, as listed in `TAXONOMY`,
+instead of being matched by substring (`'en'` finds 'Men' and 'Women', but
+also any future value that happens to contain it).
+
+`axis_gaps` and `axis_spreads` compare the groups of every axis from a
+single pass over the rows: the selected statistic is pivoted once into an
+(institution x cycle x dimension) `Cube`, and the gap of each group to the
+reference group of its axis is one subtraction against the reference
+values gathered along the dimension axis.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .cube import Cube
+from .instrumentation import traced
+
+Dimension = namedtuple('Dimension', ['axis', 'group'])
+
+TAXONOMY = {
+    'Total': Dimension('total', 'Total'),
+    'White ethnic group': Dimension('ethnicity', 'White'),
+    'Black ethnic group': Dimension('ethnicity', 'Black'),
+    'Asian ethnic group': Dimension('ethnicity', 'Asian'),
+    'Mixed ethnic group': Dimension('ethnicity', 'Mixed'),
+    'Other ethnic group': Dimension('ethnicity', 'Other'),
+    'POLAR4 Q1': Dimension('polar', 'Q1'),
+    'POLAR4 Q2': Dimension('polar', 'Q2'),
+    'POLAR4 Q3': Dimension('polar', 'Q3'),
+    'POLAR4 Q4': Dimension('polar', 'Q4'),
+    'POLAR4 Q5': Dimension('polar', 'Q5'),
+    'SIMD 2016 Q1': Dimension('simd', 'Q1'),
+    'SIMD 2016 Q2': Dimension('simd', 'Q2'),
+    'SIMD 2016 Q3': Dimension('simd', 'Q3'),
+    'SIMD 2016 Q4': Dimension('simd', 'Q4'),
+    'SIMD 2016 Q5': Dimension('simd', 'Q5'),
+    'Men': Dimension('sex', 'Men'),
+    'Women': Dimension('sex', 'Women'),
+}
+
+AXES = ('polar', 'simd', 'ethnicity', 'sex')
+
+# the gap of a group is the offer rate of its axis' reference minus its own
+REFERENCE_GROUPS = {
+    'polar': 'Q5',
+    'simd': 'Q5',
+    'ethnicity': 'White',
+    'sex': 'Men',
+}
+
+AGEGROUP = '18 year olds'
+
+
+def axis_dimensions(axis):
+    """`equality_dimension` values of `axis`, in taxonomy order."""
+    return tuple(value for value, dim in TAXONOMY.items() if dim.axis == axis)
+
+
+def dimension_axes(dimensions):
+    """Axis and group columns of a categorical `equality_dimension` series."""
+    categories = dimensions.cat.categories
+    unknown = sorted(set(categories) - set(TAXONOMY))
+    if unknown:
+        raise KeyError(f'{unknown} not in the dimension taxonomy')
+    codes = dimensions.cat.codes.to_numpy()
+    axes = [TAXONOMY[value].axis for value in categories]
+    groups = [TAXONOMY[value].group for value in categories]
+    return pd.DataFrame({
+        'axis': pd.Categorical(np.array(axes, dtype=object)[codes]),
+        'group': pd.Categorical(np.array(groups, dtype=object)[codes]),
+    }, index=dimensions.index)
+
+
+def _axis_cube(data, statistic, agegroup):
+    """(institution x cycle x dimension) cube of `statistic` over the axis dimensions."""
+    selected = data.loc[
+        (data['statistic'] == statistic)
+        & (data['agegroup'] == agegroup)
+        & data['equality_dimension'].isin([value for axis in AXES for value in axis_dimensions(axis)]),
+        ['inst_all', 'Cycle', 'equality_dimension', 'value'],
+    ]
+    return Cube.from_frame(selected)
+
+
+@traced('dimensions.gaps')
+def axis_gaps(data, statistic='Offer rate', agegroup=AGEGROUP):
+    """Gap of every group to the reference group of its axis, for all axes.
+
+    `data` is the loaded data, or any slice of it such as `AnalyticalStore`
+    query results (the cleaned data only has the POLAR4 axis). Returns one
+    row per (inst_all, Cycle, axis, group) with the group's `value`, the
+    `reference` value of its axis and the `gap`, reference minus value.
+    """
+    cube = _axis_cube(data, statistic, agegroup)
+    dimensions = cube.coords['dimension']
+    taxonomy = [TAXONOMY[value] for value in dimensions]
+
+    # position of the reference dimension of every dimension of the cube
+    positions = {(dim.axis, dim.group): i for i, dim in enumerate(taxonomy)}
+    reference = np.array([positions.get((dim.axis, REFERENCE_GROUPS[dim.axis]), -1) for dim in taxonomy])
+    values = cube.values
+    references = np.where(reference >= 0, values[..., reference], np.nan)
+
+    inst, cycle, dim = np.nonzero(cube.mask)
+    return pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=cube.coords['inst']),
+        'Cycle': cube.coords['cycle'].to_numpy()[cycle],
+        'axis': pd.Categorical([taxonomy[i].axis for i in dim], categories=AXES),
+        'group': [taxonomy[i].group for i in dim],
+        'value': values[inst, cycle, dim],
+        'reference': references[inst, cycle, dim],
+        'gap': references[inst, cycle, dim] - values[inst, cycle, dim],
+    })
+
+
+@traced('dimensions.spreads')
+def axis_spreads(data, statistic='Offer rate', agegroup=AGEGROUP):
+    """Highest minus lowest value across the groups of each axis.
+
+    Returns one row per (inst_all, Cycle, axis) with the `spread` and the
+    groups with the lowest and highest values, for every axis with at
+    least two groups with a value.
+    """
+    cube = _axis_cube(data, statistic, agegroup)
+    taxonomy = [TAXONOMY[value] for value in cube.coords['dimension']]
+
+    parts = {
+        'inst': [np.array([], dtype=np.intp)],
+        'cycle': [np.array([], dtype=np.intp)],
+        'axis': [np.array([], dtype=np.intp)],
+        'spread': [np.array([], dtype=np.float32)],
+        'low_group': [np.array([], dtype=object)],
+        'high_group': [np.array([], dtype=object)],
+    }
+    for axis in AXES:
+        positions = [i for i, dim in enumerate(taxonomy) if dim.axis == axis]
+        if len(positions) < 2:
+            continue
+        # the axis' slice of the pivoted array: no copy of the rows
+        values = cube.values[..., positions]
+        valid = ~np.isnan(values)
+        high = np.where(valid, values, -np.inf)
+        low = np.where(valid, values, np.inf)
+        inst, cycle = np.nonzero(valid.sum(axis=-1) >= 2)
+        groups = np.array([taxonomy[i].group for i in positions], dtype=object)
+        parts['inst'].append(inst)
+        parts['cycle'].append(cycle)
+        parts['axis'].append(np.full(len(inst), AXES.index(axis)))
+        parts['spread'].append((high.max(axis=-1) - low.min(axis=-1))[inst, cycle])
+        parts['low_group'].append(groups[low.argmin(axis=-1)[inst, cycle]])
+        parts['high_group'].append(groups[high.argmax(axis=-1)[inst, cycle]])
+    inst, cycle, axis, spread, low_group, high_group = (np.concatenate(part) for part in parts.values())
+
+    return pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=cube.coords['inst']),
+        'Cycle': cube.coords['cycle'].to_numpy()[cycle],
+        'axis': pd.Categorical.from_codes(axis, categories=AXES),
+        'spread': spread,
+        'low_group': low_group,
+        'high_group': high_group,
+    })
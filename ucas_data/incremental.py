@@ -0,0 +1,121 @@
+"""Cleaned store updated one cycle at a time.
+
+UCAS publishes one new `Cycle` per year. Instead of re-cleaning the whole
+file and rebuilding every derived table, `CleanedStore` keeps each table
+partitioned by cycle, one Feather file per cycle:
+
+    store/
+        peers.json
+        clean/cycle=2021.feather
+        agegroup/cycle=2021.feather
+        offer_rate/cycle=2021.feather
+        metrics/cycle=2021.feather
+
+Every table only depends on the rows of its own cycle (the peer means of
+`benchmark` are taken within a cycle), so `append_cycle` validates, cleans
+and derives the new rows only and writes their partitions, at a cost that
+grows with the new data rather than with the history. Requires `pyarrow`.
+"""
+
+import json
+from pathlib import Path
+
+from .agegroup import agegroup_proportions
+from .benchmarking import UOB_PEERS, benchmark
+from .cache import read_cache, write_cache
+from .charts import offer_rate_data
+from .cleaning import clean_data
+from .instrumentation import traced
+from .loader import SchemaError, apply_schema, concat_data, load_data
+
+TABLES = ('clean', 'agegroup', 'offer_rate', 'metrics')
+
+
+def _partition_cycle(path):
+    return int(path.stem.split('=', 1)[1])
+
+
+class CleanedStore:
+    """Directory of cleaned data and derived tables, partitioned by cycle."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _partition(self, table, cycle):
+        return self.directory / table / f'cycle={cycle}.feather'
+
+    @property
+    def cycles(self):
+        """Cycles held by the store."""
+        return sorted(_partition_cycle(path) for path in (self.directory / 'clean').glob('*.feather'))
+
+    @property
+    def peers(self):
+        path = self.directory / 'peers.json'
+        return json.loads(path.read_text()) if path.exists() else UOB_PEERS
+
+    def read(self, table='clean', cycles=None):
+        """Concatenated partitions of `table`, for `cycles` (default: all)."""
+        cycles = self.cycles if cycles is None else cycles
+        return concat_data(read_cache(self._partition(table, cycle)) for cycle in cycles)
+
+    def stored_columns(self):
+        """Columns and dtypes of the stored cleaned data, or None when empty."""
+        cycles = self.cycles
+        if not cycles:
+            return None
+        stored = read_cache(self._partition('clean', cycles[-1]))
+        return {col: str(dtype) for col, dtype in stored.dtypes.items()}
+
+    def _derive(self, rows, clean, peers):
+        """The tables of `TABLES` for the typed raw `rows` and their cleaned version."""
+        return {
+            'clean': clean,
+            'agegroup': agegroup_proportions(rows),
+            'offer_rate': offer_rate_data(clean),
+            'metrics': benchmark(clean, peers),
+        }
+
+    def _write(self, tables):
+        written = {}
+        for table, frame in tables.items():
+            written[table] = len(frame)
+            for cycle, part in frame.groupby(frame['Cycle'].dt.year if table == 'offer_rate' else 'Cycle'):
+                write_cache(part.reset_index(drop=True), self._partition(table, cycle))
+        return written
+
+    def build(self, data, peers=UOB_PEERS, **params):
+        """Fill the store from the loaded (uncleaned) `data`, replacing its content."""
+        for table in TABLES:
+            for path in (self.directory / table).glob('*.feather'):
+                path.unlink()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / 'peers.json').write_text(json.dumps(peers))
+        return self._write(self._derive(data, clean_data(data, **params), peers))
+
+    @traced('incremental.append')
+    def append_cycle(self, rows, replace=False, **params):
+        """Validate, clean and derive the rows of new cycles, and store them.
+
+        `rows` is a frame of uncleaned UCAS rows or the path of a UCAS file.
+        They are checked against the loader's schema and the columns of the
+        stored data; cycles already in the store are refused unless
+        `replace` is set. Returns the number of rows written per table.
+        """
+        rows = load_data(rows) if isinstance(rows, (str, Path)) else apply_schema(rows)
+
+        existing = sorted(set(rows['Cycle'].unique().tolist()) & set(self.cycles))
+        if existing and not replace:
+            raise SchemaError(f'cycles already stored: {existing}')
+
+        clean = clean_data(rows, **params)
+        stored = self.stored_columns()
+        new = {col: str(dtype) for col, dtype in clean.dtypes.items()}
+        if stored is not None and stored != new:
+            raise SchemaError(f'columns {new} do not match the stored columns {stored}')
+
+        # partitions of replaced cycles may be missing from the new tables
+        for cycle in existing:
+            for table in TABLES:
+                self._partition(table, cycle).unlink(missing_ok=True)
+        return self._write(self._derive(rows, clean, self.peers))
@@ -0,0 +1,76 @@
+"""Institution index built once from the distinct `inst_all` values.
+
+`inst_all` values are an institution code followed by its name, e.g.
+`'B32 University of Birmingham'`. String operations on the code or the name
+are done on the ~130 distinct values only; rows are then selected through
+their categorical codes, so checks and filters cost one integer pass over
+the rows instead of one string operation per row.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _categories(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories
+    return pd.Index(series.unique())
+
+
+def _row_positions(series, categories):
+    """Position of each row of `series` in `categories` (-1 when missing)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = np.append(categories.get_indexer(series.cat.categories), -1)
+        return lookup[series.cat.codes.to_numpy()]
+    return categories.get_indexer(series)
+
+
+class InstitutionIndex:
+    """Code -> `inst_all` mapping over a set of distinct institutions."""
+
+    def __init__(self, institutions):
+        self.labels = pd.Index(sorted(set(institutions)))
+        self.codes = pd.Index(self.labels.str[:3])
+        self.names = pd.Index(self.labels.str[4:])
+        if not self.codes.is_unique:
+            raise ValueError('institution codes are not unique')
+
+    @classmethod
+    def from_series(cls, inst_all):
+        """Index of the institutions in an `inst_all` column."""
+        return cls(_categories(inst_all))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, code):
+        return code in self.codes
+
+    def label(self, code):
+        """`inst_all` value of the institution with code `code`."""
+        return self.labels[self.codes.get_loc(code)]
+
+    def labels_for(self, codes):
+        """`inst_all` values of `codes`, in the order given; unknown codes are skipped."""
+        positions = self.codes.get_indexer(list(codes))
+        return list(self.labels[positions[positions >= 0]])
+
+    def search(self, pattern, case=False, regex=True):
+        """`inst_all` values matching `pattern`."""
+        return list(self.labels[self.labels.str.contains(pattern, case=case, regex=regex)])
+
+    def mask(self, inst_all, codes):
+        """Boolean row mask of `inst_all` values whose code is in `codes`."""
+        positions = self.codes.get_indexer(list(codes))
+        # the extra last slot is looked up by rows missing from the index
+        selected = np.zeros(len(self.labels) + 1, dtype=bool)
+        selected[positions[positions >= 0]] = True
+        return pd.Series(selected[_row_positions(inst_all, self.labels)], index=inst_all.index)
+
+    def check_codes(self, inst_all, institution_code):
+        """Whether every `institution_code` row is the code of its `inst_all` row."""
+        actual = _categories(institution_code)
+        # -2 never matches a row position, so rows missing from the index fail
+        expected = np.append(actual.get_indexer(self.codes), -2)
+        rows = _row_positions(inst_all, self.labels)
+        return bool((expected[rows] == _row_positions(institution_code, actual)).all())
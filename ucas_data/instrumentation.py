@@ -0,0 +1,180 @@
+"""Opt-in stage-level instrumentation of the pipeline.
+
+Cleaning and analysis functions are decorated with `traced`. While a
+`Tracer` is active (see `tracing`), every call records its wall time, the
+peak increase of the process RSS during the call and the rows it received
+and returned; otherwise the decorator costs a single global lookup. Traces
+are written as JSON, or in the Chrome trace event format that
+`chrome://tracing` and Perfetto open, to compare runs.
+
+    with tracing() as tracer:
+        clean_data(load_data())
+    tracer.write_json('trace.json')
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SAMPLE_INTERVAL = 0.002
+
+_TRACER = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss():
+    """Resident set size of the process in bytes.
+
+    Read from `/proc` where available; elsewhere falls back to the peak RSS
+    reported by `getrusage`.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _PeakSampler(threading.Thread):
+    """Background thread tracking the highest RSS seen while it runs."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+def _rows(obj):
+    return len(obj) if hasattr(obj, 'columns') else None
+
+
+class Tracer:
+    """Collects one event per traced stage."""
+
+    def __init__(self, sample_interval=SAMPLE_INTERVAL):
+        self.sample_interval = sample_interval
+        self.events = []
+        self._depth = 0
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Record the stage `name`; set `rows_out` on the yielded event."""
+        event = {'name': name, 'depth': self._depth, 'rows_in': rows_in, 'rows_out': None}
+        sampler = _PeakSampler(self.sample_interval)
+        rss = sampler.peak
+        sampler.start()
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            end = time.perf_counter()
+            self._depth -= 1
+            event.update({
+                'start': start - self._origin,
+                'seconds': end - start,
+                'rss_start': rss,
+                'peak_rss_delta': sampler.stop() - rss,
+            })
+            self.events.append(event)
+
+    def to_json(self):
+        """Events ordered by start time."""
+        return sorted(self.events, key=lambda event: event['start'])
+
+    def write_json(self, path):
+        Path(path).write_text(json.dumps(self.to_json(), indent=2))
+
+    def to_chrome_trace(self):
+        """Events in the Chrome trace event format (complete events)."""
+        return {
+            'traceEvents': [
+                {
+                    'name': event['name'],
+                    'cat': 'ucas_data',
+                    'ph': 'X',
+                    'ts': event['start'] * 1e6,
+                    'dur': event['seconds'] * 1e6,
+                    'pid': os.getpid(),
+                    'tid': 0,
+                    'args': {
+                        key: event[key]
+                        for key in ('rows_in', 'rows_out', 'peak_rss_delta')
+                    },
+                }
+                for event in self.to_json()
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_chrome_trace(self, path):
+        Path(path).write_text(json.dumps(self.to_chrome_trace()))
+
+
+@contextmanager
+def tracing(tracer=None):
+    """Activate `tracer` (a new `Tracer` by default) for the duration of the block."""
+    global _TRACER
+    previous, _TRACER = _TRACER, tracer or Tracer()
+    try:
+        yield _TRACER
+    finally:
+        _TRACER = previous
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """`Tracer.stage` of the active tracer, or a no-op without one."""
+    if _TRACER is None:
+        yield {}
+        return
+    with _TRACER.stage(name, rows_in) as event:
+        yield event
+
+
+def traced(name):
+    """Decorator recording calls as the stage `name` when tracing is active.
+
+    Rows in are those of the first frame argument, rows out those of the
+    returned frame (or of the first frame of a returned tuple).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _TRACER is None:
+                return func(*args, **kwargs)
+            rows_in = next((_rows(arg) for arg in args if _rows(arg) is not None), None)
+            with _TRACER.stage(name, rows_in) as event:
+                result = func(*args, **kwargs)
+                out = result[0] if isinstance(result, tuple) and result else result
+                event['rows_out'] = _rows(out)
+            return result
+        return wrapper
+    return decorator
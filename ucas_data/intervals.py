@@ -0,0 +1,160 @@
+"""Confidence intervals of offer rates and of the Q5-Q1 offer rate gap.
+
+Offer rates are `Offers` over `June deadline applicants`, and small
+providers have few Q1 applicants: the intervals show which gaps are larger
+than their sampling noise. They are computed for every institution, cycle
+and POLAR4 quintile at once from the (institution x cycle x quintile)
+arrays of the `Cube`:
+
+- `wilson`: Wilson score intervals of the rates, and Newcombe's hybrid
+  score interval of the gap, in closed form
+- `bootstrap`: parametric bootstrap, resampling offers from a binomial
+  distribution for every cell in one `rng.binomial` call per chunk of cells;
+  chunks can be spread across a process pool and each one has its own seed
+  (spawned from `seed`), so results do not depend on the number of workers
+
+UCAS rounds counts to the nearest 5, so intervals of very small groups are
+indicative only.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from .benchmarking import AGEGROUP
+from .cleaning import POLAR_DIMENSIONS
+from .cube import Cube
+from .instrumentation import traced
+
+ALPHA = 0.05
+DRAWS = 2000
+
+# resampled values held in memory per chunk of cells
+CHUNK_ELEMENTS = 1 << 22
+
+
+def offer_counts(data):
+    """Offers, applicants and cube coordinates of every institution, cycle and quintile."""
+    cube = data if isinstance(data, Cube) else Cube.from_frame(data)
+    select = lambda statistic: cube.sel(
+        statistic=statistic,
+        dimension=list(POLAR_DIMENSIONS),
+        agegroup=AGEGROUP,
+    ).values.astype(np.float64)
+    return select('Offers'), select('June deadline applicants'), cube.coords
+
+
+def wilson_interval(offers, applicants, alpha=ALPHA):
+    """Bounds of the Wilson score interval of `offers / applicants`."""
+    z = NormalDist().inv_cdf(1 - alpha / 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.clip(offers / applicants, 0, 1)
+        denominator = 1 + z * z / applicants
+        centre = (rate + z * z / (2 * applicants)) / denominator
+        half = z * np.sqrt(rate * (1 - rate) / applicants + z * z / (4 * applicants ** 2)) / denominator
+    return centre - half, centre + half
+
+
+def newcombe_interval(offers, applicants, alpha=ALPHA):
+    """Bounds of Newcombe's interval of the Q5 minus Q1 rate (last axis)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.clip(offers / applicants, 0, 1)
+    low, high = wilson_interval(offers, applicants, alpha)
+    q1, q5 = 0, -1
+    gap = rate[..., q5] - rate[..., q1]
+    below = np.sqrt((rate[..., q5] - low[..., q5]) ** 2 + (high[..., q1] - rate[..., q1]) ** 2)
+    above = np.sqrt((high[..., q5] - rate[..., q5]) ** 2 + (rate[..., q1] - low[..., q1]) ** 2)
+    return gap - below, gap + above
+
+
+def _bootstrap_chunk(offers, applicants, draws, seed, alpha):
+    """Percentile bounds of resampled rates and gaps of a chunk of (cell x quintile) counts."""
+    rng = np.random.default_rng(seed)
+    valid = (applicants > 0) & ~np.isnan(offers)
+    n = np.where(valid, applicants, 0).astype(np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = np.where(valid, np.clip(offers / applicants, 0, 1), 0)
+
+    # (draw x cell x quintile) resampled offer rates
+    rates = rng.binomial(n, p, size=(draws, *n.shape)) / np.where(valid, n, 1)
+    rates[:, ~valid] = np.nan
+    quantiles = [alpha / 2, 1 - alpha / 2]
+    rate_bounds = np.quantile(rates, quantiles, axis=0)
+    gap_bounds = np.quantile(rates[..., -1] - rates[..., 0], quantiles, axis=0)
+    return rate_bounds, gap_bounds
+
+
+def bootstrap_intervals(offers, applicants, draws=DRAWS, alpha=ALPHA, seed=0, workers=None):
+    """Bootstrap bounds of the rates and of the Q5 minus Q1 gap (last axis).
+
+    Returns ((low, high) of the rates, (low, high) of the gaps).
+    """
+    shape = offers.shape
+    offers = offers.reshape(-1, shape[-1])
+    applicants = applicants.reshape(-1, shape[-1])
+    size = max(1, CHUNK_ELEMENTS // (draws * shape[-1]))
+    starts = range(0, len(offers), size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    args = (
+        [offers[start:start + size] for start in starts],
+        [applicants[start:start + size] for start in starts],
+        [draws] * len(starts),
+        seeds,
+        [alpha] * len(starts),
+    )
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            chunks = list(pool.map(_bootstrap_chunk, *args))
+    else:
+        chunks = list(map(_bootstrap_chunk, *args))
+
+    rate_bounds = np.concatenate([rates for rates, _ in chunks], axis=1).reshape(2, *shape)
+    gap_bounds = np.concatenate([gaps for _, gaps in chunks], axis=1).reshape(2, *shape[:-1])
+    return tuple(rate_bounds), tuple(gap_bounds)
+
+
+@traced('intervals')
+def offer_rate_intervals(data, method='wilson', alpha=ALPHA, draws=DRAWS, seed=0, workers=None):
+    """Confidence intervals of the offer rates and Q5-Q1 gaps of every institution.
+
+    `data` is the cleaned data or its `Cube`; `method` is `wilson` or
+    `bootstrap` (with `draws` resamples, chunked across `workers`
+    processes). Returns two frames: one row per (inst_all, Cycle,
+    equality_dimension) with the counts, `offer_rate`, `low` and `high`,
+    and one row per (inst_all, Cycle) with the `gap`, `low` and `high`.
+    """
+    offers, applicants, coords = offer_counts(data)
+    if method == 'wilson':
+        rate_bounds = wilson_interval(offers, applicants, alpha)
+        gap_bounds = newcombe_interval(offers, applicants, alpha)
+    elif method == 'bootstrap':
+        rate_bounds, gap_bounds = bootstrap_intervals(offers, applicants, draws, alpha, seed, workers)
+    else:
+        raise ValueError(f'unknown interval method: {method}')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.clip(offers / applicants, 0, 1)
+
+    valid = (applicants > 0) & ~np.isnan(offers)
+    inst, cycle, dim = np.nonzero(valid)
+    rates = pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=coords['inst']),
+        'Cycle': coords['cycle'].to_numpy()[cycle],
+        'equality_dimension': pd.Categorical.from_codes(dim, categories=POLAR_DIMENSIONS),
+        'offers': offers[inst, cycle, dim],
+        'applicants': applicants[inst, cycle, dim],
+        'offer_rate': rate[inst, cycle, dim],
+        'low': rate_bounds[0][inst, cycle, dim],
+        'high': rate_bounds[1][inst, cycle, dim],
+    })
+
+    inst, cycle = np.nonzero(valid[..., 0] & valid[..., -1])
+    gaps = pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=coords['inst']),
+        'Cycle': coords['cycle'].to_numpy()[cycle],
+        'gap': rate[inst, cycle, -1] - rate[inst, cycle, 0],
+        'low': gap_bounds[0][inst, cycle],
+        'high': gap_bounds[1][inst, cycle],
+    })
+    return rates, gaps
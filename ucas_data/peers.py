@@ -0,0 +1,161 @@
+"""Data-driven peer groups from institution profiles.
+
+The analysis picks its reference points and models by hand from league
+tables. Here every institution gets a profile from the cleaned data,
+averaged over the selected cycles:
+
+- the POLAR4 quintile shares of June deadline applicants and of placed
+  applicants
+- the offer rate of each quintile
+- the log of its number of June deadline applicants
+
+Features are standardised and the peers of an institution are its `k`
+nearest neighbours in Euclidean distance. All pairwise distances come from
+one matrix product (|a|^2 + |b|^2 - 2 a.b); with `block_size` they are
+computed for blocks of rows at a time and only the `k` nearest of each row
+are kept, so memory stays linear in the number of institutions.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .benchmarking import AGEGROUP
+from .cleaning import POLAR_DIMENSIONS
+from .cube import Cube
+from .instrumentation import traced
+
+K = 5
+
+FEATURES = (
+    [f'applicant_share_{dim[-2:]}' for dim in POLAR_DIMENSIONS]
+    + [f'placed_share_{dim[-2:]}' for dim in POLAR_DIMENSIONS]
+    + [f'offer_rate_{dim[-2:]}' for dim in POLAR_DIMENSIONS]
+    + ['log_applicants']
+)
+
+
+def _total(values):
+    """Sum over the quintiles (last axis), NaN when none has a value."""
+    total = np.nansum(values, axis=-1, keepdims=True)
+    return np.where(np.isnan(values).all(axis=-1, keepdims=True), np.nan, total)
+
+
+def institution_features(data, cycles=None):
+    """Profile of every institution of the cleaned `data` (or its `Cube`).
+
+    Returns a frame indexed by `inst_all` with the `FEATURES` columns,
+    averaged over `cycles` (default: all).
+    """
+    cube = data if isinstance(data, Cube) else Cube.from_frame(data)
+    if cycles is not None:
+        cube = cube.sel(cycle=list(cycles))
+    select = lambda statistic: cube.sel(
+        statistic=statistic,
+        dimension=list(POLAR_DIMENSIONS),
+        agegroup=AGEGROUP,
+    ).values
+
+    applicants = select('June deadline applicants')
+    placed = select('Placed June deadline applicants')
+    rates = select('Offer rate')
+    with np.errstate(divide='ignore', invalid='ignore'), warnings.catch_warnings():
+        # institutions without any value for a feature get NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        applicant_total = _total(applicants)
+        features = np.concatenate([
+            np.nanmean(applicants / applicant_total, axis=1),
+            np.nanmean(placed / _total(placed), axis=1),
+            np.nanmean(rates, axis=1),
+            np.log1p(np.nanmean(applicant_total, axis=1)),
+        ], axis=1)
+    return pd.DataFrame(features, index=cube.coords['inst'], columns=FEATURES)
+
+
+def standardise(features):
+    """Features scaled to zero mean and unit variance, missing values at the mean."""
+    values = np.asarray(features, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    scaled = (values - mean) / np.where(std > 0, std, 1)
+    return np.nan_to_num(scaled, nan=0.0)
+
+
+def _squared_distances(rows, points, point_norms):
+    """Squared Euclidean distances between `rows` and all `points`."""
+    distances = (rows * rows).sum(axis=1)[:, None] + point_norms[None, :] - 2 * rows @ points.T
+    return np.maximum(distances, 0)
+
+
+def _nearest(distances, offset, k):
+    """Positions and distances of the `k` nearest points of each row, self excluded."""
+    rows = np.arange(len(distances))
+    distances[rows, rows + offset] = np.inf
+    nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+    order = np.argsort(nearest_distances, axis=1, kind='stable')
+    nearest_distances = np.take_along_axis(nearest_distances, order, axis=1)
+    return np.take_along_axis(nearest, order, axis=1), np.sqrt(nearest_distances)
+
+
+def nearest_neighbours(points, k=K, block_size=None):
+    """`k` nearest neighbours of every row of `points` (excluding itself).
+
+    Returns (positions, distances), both of shape (len(points), k). With
+    `block_size`, distances are computed `block_size` rows at a time.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    k = min(k, len(points) - 1)
+    norms = (points * points).sum(axis=1)
+    block_size = block_size or len(points)
+    blocks = [
+        _nearest(_squared_distances(points[start:start + block_size], points, norms), start, k)
+        for start in range(0, len(points), block_size)
+    ]
+    positions, distances = zip(*blocks)
+    return np.concatenate(positions), np.concatenate(distances)
+
+
+@traced('peers')
+def find_peers(data, k=K, institutions=None, cycles=None, block_size=None):
+    """The `k` institutions with the most similar profiles to each institution.
+
+    `data` is the cleaned data; `institutions` restricts the result to some
+    institutions (codes or `inst_all` values), their peers being searched
+    among all institutions. Returns one row per (inst_all, rank) with the
+    `peer` and its `distance` in standardised feature space.
+    """
+    features = institution_features(data, cycles)
+    labels = features.index
+    positions, distances = nearest_neighbours(standardise(features), k, block_size)
+
+    rows = np.arange(len(labels))
+    if institutions is not None:
+        codes = pd.Index(labels.str[:3])
+        rows = np.unique(np.concatenate([
+            np.flatnonzero(labels.isin(institutions)),
+            np.flatnonzero(codes.isin(institutions)),
+        ]))
+    k = positions.shape[1]
+    return pd.DataFrame({
+        'inst_all': pd.Categorical(np.repeat(labels[rows], k), categories=labels),
+        'rank': np.tile(np.arange(1, k + 1), len(rows)),
+        'peer': pd.Categorical(labels[positions[rows].ravel()], categories=labels),
+        'distance': distances[rows].ravel(),
+    })
+
+
+def peer_groups(peers):
+    """`find_peers` results as a mapping of institution code to peer codes.
+
+    The mapping has the shape of `UOB_PEERS`, for `benchmark` and
+    `render_reports`.
+    """
+    codes = peers.assign(code=peers['inst_all'].str[:3], peer_code=peers['peer'].str[:3])
+    return {
+        code: tuple(group.sort_values('rank')['peer_code'])
+        for code, group in codes.groupby('code', sort=True)
+    }
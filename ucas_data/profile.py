@@ -0,0 +1,99 @@
+"""Lightweight data-quality profile of the UCAS schema.
+
+Replaces the `pandas_profiling` report, which is too slow on this dataset,
+the loops printing `.unique()` for every column of `data_null` and
+`data_na`, and the all-zero `groupby(...).max()` checks of the analysis.
+The null, zero and negative flags of `value` are computed once and every
+breakdown is a `bincount` over categorical codes, so profiling a new data
+drop takes a single pass per column. The result only holds plain Python
+types and can be dumped with `json.dumps`.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .cube import _factorize
+from .instrumentation import traced
+
+BREAKDOWNS = ('statistic', 'inst_all')
+
+
+def _value_flags(value):
+    values = value.to_numpy(dtype=np.float64, na_value=np.nan)
+    return {
+        'nulls': np.isnan(values),
+        'zeros': values == 0,
+        'negatives': values < 0,
+    }
+
+
+def _labels(values):
+    return [value.item() if isinstance(value, np.generic) else value for value in values]
+
+
+def _breakdown(series, flags):
+    """Rows and flag counts per distinct value of `series`."""
+    codes, labels = _factorize(series)
+    present = codes >= 0
+    codes = codes[present]
+    counts = {'rows': np.bincount(codes, minlength=len(labels))}
+    for name, flag in flags.items():
+        counts[name] = np.bincount(codes, weights=flag[present], minlength=len(labels))
+    return [
+        {series.name: label, **{name: int(count[i]) for name, count in counts.items()}}
+        for i, label in enumerate(_labels(labels))
+    ]
+
+
+def all_zero_cycles(data):
+    """Institution-cycles whose values are all zero (or missing)."""
+    maxima = data.groupby(['inst_all', 'Cycle'], observed=True)['value'].max()
+    zeros = maxima[maxima.fillna(0) == 0].reset_index()
+    return [
+        {'inst_all': inst, 'Cycle': int(cycle)}
+        for inst, cycle in zip(zeros['inst_all'], zeros['Cycle'])
+    ]
+
+
+@traced('profile')
+def profile_data(data, breakdowns=BREAKDOWNS):
+    """Profile a frame returned by `load_data` or `clean_data`.
+
+    Returns a dict with the per-column cardinality, the summary of `value`,
+    its null/zero/negative counts per value of each column in `breakdowns`,
+    the statistics with negative values and the all-zero institution-cycles.
+    """
+    flags = _value_flags(data['value'])
+    values = data['value']
+
+    columns = {}
+    for col in data.columns:
+        if col == 'value':
+            continue
+        _, labels = _factorize(data[col])
+        columns[col] = {
+            'dtype': str(data[col].dtype),
+            'cardinality': len(labels),
+            'nulls': int(data[col].isna().sum()),
+        }
+
+    negative_statistics = []
+    if 'statistic' in data.columns:
+        negative_statistics = _labels(pd.unique(data['statistic'][flags['negatives']]))
+
+    return {
+        'rows': len(data),
+        'columns': columns,
+        'value': {
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            **{name: int(flag.sum()) for name, flag in flags.items()},
+        },
+        'breakdowns': {
+            col: _breakdown(data[col], flags)
+            for col in breakdowns if col in data.columns
+        },
+        'negative_statistics': negative_statistics,
+        'all_zero_cycles': all_zero_cycles(data),
+    }
@@ -0,0 +1,147 @@
+"""Ingest of several UCAS releases and the revisions between them.
+
+Each annual release re-publishes the earlier cycles, sometimes with revised
+values. `load_releases` parses a directory of release files in parallel,
+one file per worker process. Releases are then aligned on a single integer
+key per cell, the flat index of (institution, cycle, statistic, dimension,
+agegroup) over the vocabularies shared by all releases, so that matching
+cells across releases is a sort and a `searchsorted` over integer arrays
+rather than a merge of frames on five columns.
+
+`revision_table` compares every release with the previous one (by file
+name) and keeps only the cells that changed.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import traced
+from .loader import FIXED_CATEGORIES, load_data
+
+KEY_COLUMNS = ['inst_all', 'Cycle', 'statistic', 'equality_dimension', 'agegroup']
+
+
+@traced('releases.load')
+def load_releases(directory, pattern='*.csv', workers=None):
+    """Typed data of every release file in `directory`, keyed by file stem.
+
+    Files are parsed by `workers` processes (one per file) when given.
+    """
+    paths = sorted(Path(directory).glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f'no release matching {pattern} in {directory}')
+    if workers and workers > 1:
+        with ProcessPoolExecutor(min(workers, len(paths))) as pool:
+            frames = list(pool.map(load_data, paths))
+    else:
+        frames = [load_data(path) for path in paths]
+    return {path.stem: frame for path, frame in zip(paths, frames)}
+
+
+class ReleaseKeys:
+    """Flat integer keys of cells over the vocabularies of several releases."""
+
+    def __init__(self, frames):
+        frames = list(frames)
+        self.institutions = pd.Index(sorted(set().union(*(f['inst_all'].cat.categories for f in frames))))
+        cycles = np.concatenate([f['Cycle'].unique() for f in frames])
+        self.first_cycle = int(cycles.min())
+        self.levels = {
+            'inst_all': self.institutions,
+            'Cycle': pd.RangeIndex(self.first_cycle, int(cycles.max()) + 1),
+            **{col: pd.Index(FIXED_CATEGORIES[col]) for col in KEY_COLUMNS[2:]},
+        }
+        self.shape = tuple(len(self.levels[col]) for col in KEY_COLUMNS)
+
+    def encode(self, data):
+        """Key of every row of `data`."""
+        inst = self.institutions.get_indexer(data['inst_all'].cat.categories)[data['inst_all'].cat.codes]
+        codes = [
+            inst,
+            data['Cycle'].to_numpy() - self.first_cycle,
+            *(data[col].cat.codes.to_numpy() for col in KEY_COLUMNS[2:]),
+        ]
+        return np.ravel_multi_index(codes, self.shape)
+
+    def decode(self, keys):
+        """Frame of the `KEY_COLUMNS` of `keys`."""
+        codes = np.unravel_index(keys, self.shape)
+        columns = {}
+        for col, code in zip(KEY_COLUMNS, codes):
+            if col == 'Cycle':
+                columns[col] = (code + self.first_cycle).astype(np.int16)
+            else:
+                columns[col] = pd.Categorical.from_codes(code, categories=self.levels[col])
+        return pd.DataFrame(columns)
+
+
+@traced('releases.align')
+def align_releases(releases):
+    """Values of every cell of any release, one column per release.
+
+    `releases` maps release names to typed frames. Returns the `ReleaseKeys`,
+    the sorted cell keys, a (cell x release) `float32` array of values and a
+    boolean array of the cells present in each release.
+    """
+    keys = ReleaseKeys(releases.values())
+    encoded = [keys.encode(frame) for frame in releases.values()]
+    cells = np.unique(np.concatenate(encoded))
+
+    values = np.full((len(cells), len(releases)), np.nan, dtype=np.float32)
+    present = np.zeros((len(cells), len(releases)), dtype=bool)
+    for i, (name, frame) in enumerate(releases.items()):
+        positions = np.searchsorted(cells, encoded[i])
+        if (np.bincount(positions, minlength=len(cells)) > 1).any():
+            raise ValueError(f'release {name} has more than one row per cell')
+        values[positions, i] = frame['value'].to_numpy(dtype=np.float32, na_value=np.nan)
+        present[positions, i] = True
+    return keys, cells, values, present
+
+
+@traced('releases.revisions')
+def revision_table(releases, atol=0.0):
+    """Cells that changed between each release and the previous one.
+
+    A cell is `revised` when its value changed by more than `atol` (or became
+    or stopped being missing), `added` or `removed` when it is only in one of
+    the two releases. Cells of cycles that only one of the two releases covers
+    are new or dropped cycles, not revisions, and are left out. Returns one
+    row per change with the key columns, both release names and values.
+    """
+    names = list(releases)
+    if len(names) < 2:
+        raise ValueError('revisions need at least two releases')
+    keys, cells, values, present = align_releases(releases)
+    cycles = np.unravel_index(cells, keys.shape)[1]
+
+    parts = []
+    for i in range(1, len(names)):
+        before, after = values[:, i - 1], values[:, i]
+        in_before, in_after = present[:, i - 1], present[:, i]
+        covered = np.zeros(keys.shape[1], dtype=bool)
+        covered[np.intersect1d(cycles[in_before], cycles[in_after])] = True
+
+        both = in_before & in_after
+        missing_changed = np.isnan(before) != np.isnan(after)
+        with np.errstate(invalid='ignore'):
+            value_changed = np.abs(after - before) > atol
+        change = np.select(
+            [both & (missing_changed | value_changed), in_after & ~in_before, in_before & ~in_after],
+            [1, 2, 3],
+            default=0,
+        )
+        rows = np.flatnonzero((change > 0) & covered[cycles])
+        part = keys.decode(cells[rows])
+        part['previous_release'] = names[i - 1]
+        part['release'] = names[i]
+        part['previous_value'] = before[rows]
+        part['value'] = after[rows]
+        part['change'] = pd.Categorical.from_codes(change[rows] - 1, categories=['revised', 'added', 'removed'])
+        parts.append(part)
+
+    table = pd.concat(parts, ignore_index=True)
+    table[['previous_release', 'release']] = table[['previous_release', 'release']].astype('category')
+    return table
@@ -0,0 +1,102 @@
+"""Batch rendering of per-institution chart reports.
+
+A report bundles, for an institution and its peers, the two faceted charts
+of the analysis and the pivot table of their cleaned data. Reports are
+rendered in parallel across processes. Workers never read the CSV: each one
+memory-maps the cleaned data cache once when it starts, so all of them share
+the same pages of the Arrow file, and only the rows of a report's
+institutions are converted to pandas. Requires `pyarrow` and `altair`.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .charts import offer_rate_chart, placed_applicants_chart
+from .institutions import InstitutionIndex
+
+# memory-mapped cleaned data of the current worker, set by `_init_worker`
+_TABLE = None
+_INSTITUTIONS = None
+
+
+def _init_worker(cache_file):
+    global _TABLE, _INSTITUTIONS
+    import pyarrow.feather as feather
+
+    _TABLE = feather.read_table(cache_file, memory_map=True)
+    _INSTITUTIONS = InstitutionIndex(_TABLE['inst_all'].unique().dictionary_decode().to_pylist())
+
+
+def _report_data(labels):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    mask = pc.is_in(_TABLE['inst_all'], value_set=pa.array(labels))
+    return _TABLE.filter(mask).to_pandas()
+
+
+def render_report(data, order, output_dir, formats=('html',)):
+    """Write the charts and pivot table of `data` to `output_dir`.
+
+    `order` is the list of `inst_all` values, in facet order. Charts are saved
+    once per format in `formats` (`png` and `svg` need `vl-convert-python`).
+    Returns the number of charts written.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    charts = {
+        'offer_rate': offer_rate_chart(data, order),
+        'placed_applicants': placed_applicants_chart(data, order),
+    }
+    for name, chart in charts.items():
+        for fmt in formats:
+            chart.save(str(output_dir / f'{name}.{fmt}'))
+
+    pivot = data.pivot_table(
+        index=['inst_all', 'statistic', 'equality_dimension'],
+        columns='Cycle',
+        values='value',
+        observed=True,
+    )
+    pivot.to_html(output_dir / 'pivot_table.html')
+    return len(charts) * len(formats)
+
+
+def _render(code, peers, output_dir, formats):
+    order = _INSTITUTIONS.labels_for([code, *peers])
+    return render_report(_report_data(order), order, Path(output_dir) / code, formats)
+
+
+def render_reports(cache_file, peer_groups, output_dir, workers=None, formats=('html',)):
+    """Render the report of every institution of `peer_groups` with its peers.
+
+    `cache_file` is the cleaned data cache (see `cached_clean_data`) and
+    `peer_groups` maps institution codes to the codes of their peers; each
+    report is written to `output_dir/<code>`. Returns the number of reports
+    and charts, the elapsed seconds and the throughput in charts per second.
+    """
+    codes = list(peer_groups)
+    args = (
+        codes,
+        [peer_groups[code] for code in codes],
+        [output_dir] * len(codes),
+        [formats] * len(codes),
+    )
+
+    start = time.perf_counter()
+    if workers and workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(str(cache_file),)) as pool:
+            charts = sum(pool.map(_render, *args))
+    else:
+        _init_worker(str(cache_file))
+        charts = sum(map(_render, *args))
+    seconds = time.perf_counter() - start
+
+    return {
+        'reports': len(codes),
+        'charts': charts,
+        'seconds': seconds,
+        'charts_per_second': charts / seconds if seconds else float('inf'),
+    }
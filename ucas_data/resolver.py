@@ -0,0 +1,179 @@
+"""Resolution of free-text institution names and codes to `inst_all` values.
+
+The analysis finds institutions with hand-written regexes over the whole
+column (`'King.?s College London'`) and then spells out their exact
+`inst_all` values. `InstitutionResolver` is built once over the distinct
+institutions of an `InstitutionIndex`:
+
+- names are normalised (case, accents, apostrophes, punctuation and the
+  words of `STOPWORDS` are ignored), so `"King's College London"` and
+  `'kings college london'` are the same query
+- an inverted index of character trigrams gives, for every institution, the
+  (inverse frequency weighted) trigrams it shares with a query in one
+  `np.bincount`, from which the match score of all institutions follows
+- a query resolves to the one candidate having all its words, in order (or
+  in any order if they are all the candidate's words), long words allowing
+  a typo; it stays unresolved when none or several do, so that
+  `'University College London'`, which shares most trigrams with
+  `'Kings College London University of London'`, is not taken for it
+
+Results are memoised per resolver, so repeated lookups in batch reports
+are dictionary hits.
+"""
+
+import functools
+import re
+import unicodedata
+
+import numpy as np
+
+from .institutions import InstitutionIndex
+
+STOPWORDS = frozenset(['of', 'the', 'and', 'at', 'in'])
+
+# queries whose best match scores lower are not resolved
+MIN_SCORE = 0.4
+
+# query words at least this long match name words with similar trigrams
+TYPO_LENGTH = 5
+MIN_WORD_SCORE = 0.6
+
+
+def normalise(name):
+    """Lowercase ASCII words of `name`, without punctuation or stopwords."""
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    name = re.sub(r"['’`]", '', name.lower().replace('&', ' and '))
+    return ' '.join(word for word in re.findall(r'[a-z0-9]+', name) if word not in STOPWORDS)
+
+
+def trigrams(text):
+    """Set of the character trigrams of `text`, padded with spaces."""
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _same_word(query_word, word):
+    """Whether `query_word` is `word`, or a misspelling of a long `word`."""
+    if query_word == word:
+        return True
+    if min(len(query_word), len(word)) < TYPO_LENGTH:
+        return False
+    query_grams, grams = trigrams(query_word), trigrams(word)
+    return 2 * len(query_grams & grams) / (len(query_grams) + len(grams)) >= MIN_WORD_SCORE
+
+
+def has_words(name, query):
+    """Whether the normalised `name` has every word of the normalised `query`.
+
+    Words must come in the same order, unless the query has exactly the
+    words of the name.
+    """
+    query_words, words = query.split(), name.split()
+    if sorted(query_words) == sorted(words):
+        return True
+    remaining = iter(words)
+    return all(any(_same_word(query_word, word) for word in remaining) for query_word in query_words)
+
+
+class InstitutionResolver:
+    """Fuzzy name and code lookup over the institutions of an `InstitutionIndex`."""
+
+    def __init__(self, institutions, min_score=MIN_SCORE):
+        if not isinstance(institutions, InstitutionIndex):
+            institutions = InstitutionIndex(institutions)
+        self.institutions = institutions
+        self.min_score = min_score
+        self.normalised = [normalise(name) for name in institutions.names]
+        self._exact = {name: i for i, name in enumerate(self.normalised)}
+        self._labels = dict(zip(institutions.labels, self.normalised))
+
+        # inverted index: trigram id -> positions of the institutions having it
+        grams = [trigrams(name) for name in self.normalised]
+        self._vocabulary = {gram: i for i, gram in enumerate(sorted(set().union(*grams)))}
+        postings = [[] for _ in self._vocabulary]
+        for position, institution_grams in enumerate(grams):
+            for gram in institution_grams:
+                postings[self._vocabulary[gram]].append(position)
+        self._postings = [np.array(positions, dtype=np.intp) for positions in postings]
+        # trigrams shared by many names ('uni', 'ity', ...) weigh less
+        frequency = np.array([len(positions) for positions in postings], dtype=np.float64)
+        self._weights = np.log((1 + len(grams)) / frequency)
+        self._unknown_weight = np.log(1 + len(grams))
+        self._sizes = np.array(
+            [sum(self._weights[self._vocabulary[gram]] for gram in g) for g in grams]
+        )
+
+        self.resolve = functools.lru_cache(maxsize=None)(self._resolve)
+        self.matches = functools.lru_cache(maxsize=4096)(self._matches)
+
+    def __len__(self):
+        return len(self.institutions)
+
+    def scores(self, query):
+        """Match score of `query` against every institution, between 0 and 1.
+
+        The score is the mean of the share of the query's trigrams found in a
+        name and of the Dice coefficient of both trigram sets, trigrams being
+        weighted by their inverse frequency among the names: the first
+        favours names containing the query, the second names of similar length.
+        """
+        grams = trigrams(normalise(query))
+        known = [self._vocabulary[gram] for gram in grams if gram in self._vocabulary]
+        size = self._weights[known].sum() + (len(grams) - len(known)) * self._unknown_weight
+        shared = np.zeros(len(self._sizes))
+        if known:
+            shared = np.bincount(
+                np.concatenate([self._postings[i] for i in known]),
+                weights=np.repeat(self._weights[known], [len(self._postings[i]) for i in known]),
+                minlength=len(self._sizes),
+            )
+        coverage = shared / size
+        dice = 2 * shared / (size + self._sizes)
+        return (coverage + dice) / 2
+
+    def _matches(self, query, limit=5):
+        """Best `limit` (inst_all, score) candidates for `query`."""
+        scores = self.scores(query)
+        best = np.argsort(-scores, kind='stable')[:limit]
+        return tuple((self.institutions.labels[i], float(scores[i])) for i in best if scores[i] > 0)
+
+    def _resolve(self, query):
+        """`inst_all` value of an institution code, `inst_all` value or name.
+
+        Returns None unless exactly one of the best matches scores at least
+        `min_score` and has the words of `query` (see `has_words`).
+        """
+        query = query.strip()
+        if query in self.institutions.labels:
+            return query
+        if query.upper() in self.institutions:
+            return self.institutions.label(query.upper())
+        exact = self._exact.get(normalise(query))
+        if exact is not None:
+            return self.institutions.labels[exact]
+        words = normalise(query)
+        candidates = [
+            label for label, score in self.matches(query)
+            if score >= self.min_score and has_words(self._labels[label], words)
+        ]
+        # several names with the words of the query: ambiguous
+        return candidates[0] if len(candidates) == 1 else None
+
+    def resolve_all(self, queries):
+        """`inst_all` values of `queries`, in order; raises `KeyError` for unresolved ones."""
+        queries = list(queries)
+        labels = [self.resolve(query) for query in queries]
+        unresolved = [query for query, label in zip(queries, labels) if label is None]
+        if unresolved:
+            raise KeyError(f'no institution matches {unresolved}')
+        return labels
+
+    def codes_for(self, queries):
+        """Institution codes of `queries` (see `resolve_all`)."""
+        return [label[:3] for label in self.resolve_all(queries)]
+
+    @classmethod
+    def from_series(cls, inst_all, min_score=MIN_SCORE):
+        """Resolver over the institutions of an `inst_all` column."""
+        return cls(InstitutionIndex.from_series(inst_all), min_score)
+
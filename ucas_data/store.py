@@ -0,0 +1,248 @@
+"""Indexed SQLite store of the full, untrimmed UCAS data.
+
+Cleaning keeps a single slice of the file: POLAR4 rows of the main
+institutions and agegroup. Other slices (ethnicity and sex dimensions, other
+statistics or agegroups) are served from a SQLite database built once from
+the typed data, with the same layout as the categorical frames: the `data`
+table holds integer codes and the value, and one small table per dimension
+holds the labels. `data` is indexed on institution, statistic and cycle, so
+a query reads the matching rows only and is turned back into a frame with
+`pd.Categorical.from_codes`:
+
+    with open_store() as store:
+        store.query(institutions=['B32'], dimensions=['Men', 'Women'])
+
+Only the standard library `sqlite3` module is needed. The store records the
+hash of the file it was built from and `open_store` rebuilds it when the
+file changes.
+"""
+
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .cache import CACHE_DIR, file_hash
+from .instrumentation import traced
+from .loader import DATA_PATH, load_data
+
+STORE_PATH = f'{CACHE_DIR}/ucas.sqlite'
+
+# dimension table and query argument of each categorical column
+DIMENSION_TABLES = {
+    'inst_all': 'institutions',
+    'statistic': 'statistics',
+    'equality_dimension': 'dimensions',
+    'agegroup': 'agegroups',
+}
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE institutions (id INTEGER PRIMARY KEY, label TEXT NOT NULL, code TEXT NOT NULL);
+CREATE TABLE statistics (id INTEGER PRIMARY KEY, label TEXT NOT NULL);
+CREATE TABLE dimensions (id INTEGER PRIMARY KEY, label TEXT NOT NULL);
+CREATE TABLE agegroups (id INTEGER PRIMARY KEY, label TEXT NOT NULL);
+CREATE TABLE data (
+    inst INTEGER NOT NULL,
+    cycle INTEGER NOT NULL,
+    statistic INTEGER NOT NULL,
+    dimension INTEGER NOT NULL,
+    agegroup INTEGER NOT NULL,
+    value REAL
+);
+"""
+
+INDEXES = """
+CREATE INDEX data_inst ON data (inst, statistic, cycle);
+CREATE INDEX data_statistic ON data (statistic, cycle);
+CREATE INDEX data_cycle ON data (cycle);
+"""
+
+_CODE_COLUMNS = {
+    'inst_all': 'inst',
+    'statistic': 'statistic',
+    'equality_dimension': 'dimension',
+    'agegroup': 'agegroup',
+}
+
+
+def _as_list(values):
+    if values is None:
+        return None
+    if isinstance(values, (str, int, np.integer)):
+        return [values]
+    return list(values)
+
+
+@traced('store.build')
+def build_store(data, path=STORE_PATH, source_hash=''):
+    """Write the typed (uncleaned) `data` to a new SQLite store at `path`.
+
+    The database is written to a temporary file and moved into place once
+    indexed, so readers never see a partial store.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    tmp.unlink(missing_ok=True)
+
+    connection = sqlite3.connect(tmp)
+    try:
+        connection.executescript('PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;' + SCHEMA)
+
+        institutions = data['inst_all'].cat.categories
+        codes = (
+            data[['inst_all', 'INSTITUTION_CODE']]
+            .drop_duplicates('inst_all')
+            .set_index('inst_all')['INSTITUTION_CODE']
+            .astype(str)
+        )
+        connection.executemany(
+            'INSERT INTO institutions VALUES (?, ?, ?)',
+            [(i, label, codes.get(label, label[:3])) for i, label in enumerate(institutions)],
+        )
+        for col, table in DIMENSION_TABLES.items():
+            if table != 'institutions':
+                connection.executemany(
+                    f'INSERT INTO {table} VALUES (?, ?)',
+                    enumerate(data[col].cat.categories),
+                )
+
+        columns = [data[col].cat.codes.to_numpy().tolist() for col in _CODE_COLUMNS]
+        columns.insert(1, data['Cycle'].to_numpy().tolist())
+        # missing values are stored as NULL
+        columns.append(data['value'].astype('float64').to_numpy().tolist())
+        connection.executemany('INSERT INTO data VALUES (?, ?, ?, ?, ?, ?)', zip(*columns))
+
+        connection.executescript(INDEXES)
+        connection.executemany(
+            'INSERT INTO meta VALUES (?, ?)',
+            [('source_hash', source_hash), ('rows', str(len(data)))],
+        )
+        connection.commit()
+    finally:
+        connection.close()
+    tmp.replace(path)
+    return path
+
+
+class AnalyticalStore:
+    """Read-only query API over a store written by `build_store`."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f'no UCAS store at {self.path}')
+        self.connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+        self.connection.execute('PRAGMA mmap_size = 1073741824')
+        self.categories = {
+            col: pd.Index(self._column(f'SELECT label FROM {table} ORDER BY id'))
+            for col, table in DIMENSION_TABLES.items()
+        }
+        self.institution_codes = pd.Index(self._column('SELECT code FROM institutions ORDER BY id'))
+
+    def _column(self, query):
+        return [row[0] for row in self.connection.execute(query)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    @property
+    def source_hash(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'source_hash'").fetchone()
+        return row[0] if row else None
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM data').fetchone()[0]
+
+    @property
+    def cycles(self):
+        return self._column('SELECT DISTINCT cycle FROM data ORDER BY cycle')
+
+    def _ids(self, col, labels):
+        """Ids of `labels` in the dimension table of `col`; institutions also by code."""
+        categories = self.categories[col]
+        ids = categories.get_indexer(labels)
+        if col == 'inst_all':
+            by_code = self.institution_codes.get_indexer(labels)
+            ids = np.where(ids < 0, by_code, ids)
+        if (ids < 0).any():
+            missing = [label for label, i in zip(labels, ids) if i < 0]
+            raise KeyError(f'{missing} not in {col}')
+        return ids.tolist()
+
+    @traced('store.query')
+    def query(
+        self,
+        institutions=None,
+        cycles=None,
+        statistics=None,
+        dimensions=None,
+        agegroups=None,
+    ):
+        """Rows matching every given selection, as a frame with the loader's schema.
+
+        Each argument is a label or a list of labels; institutions can be given
+        by `inst_all` value or code. Categorical columns keep the store's full
+        categories, so frames of different queries share the same codes.
+        """
+        selections = {
+            'inst_all': _as_list(institutions),
+            'statistic': _as_list(statistics),
+            'equality_dimension': _as_list(dimensions),
+            'agegroup': _as_list(agegroups),
+        }
+        where, params = [], []
+        for col, labels in selections.items():
+            if labels is not None:
+                ids = self._ids(col, labels)
+                where.append(f"{_CODE_COLUMNS[col]} IN ({', '.join('?' * len(ids))})")
+                params.extend(ids)
+        cycles = _as_list(cycles)
+        if cycles is not None:
+            where.append(f"cycle IN ({', '.join('?' * len(cycles))})")
+            params.extend(int(cycle) for cycle in cycles)
+
+        query = 'SELECT rowid, inst, cycle, statistic, dimension, agegroup, value FROM data'
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+        rows = self.connection.execute(query, params).fetchall()
+        # NULL values become NaN
+        array = np.array(rows, dtype=np.float64).reshape(-1, 7)
+        # rows come in index order: sort them back to file order
+        array = array[np.argsort(array[:, 0], kind='stable'), 1:]
+        codes = array[:, :5].astype(np.int32)
+
+        categorical = lambda col, i: pd.Categorical.from_codes(codes[:, i], self.categories[col])
+        return pd.DataFrame({
+            'inst_all': categorical('inst_all', 0),
+            'INSTITUTION_CODE': pd.Categorical.from_codes(codes[:, 0], self.institution_codes),
+            'Cycle': codes[:, 1].astype(np.int16),
+            'statistic': categorical('statistic', 2),
+            'equality_dimension': categorical('equality_dimension', 3),
+            'agegroup': categorical('agegroup', 4),
+            'value': array[:, 5].astype(np.float32),
+        })
+
+    def sql(self, query, params=()):
+        """Result of an arbitrary read-only SQL `query` as a frame."""
+        return pd.read_sql_query(query, self.connection, params=params)
+
+
+def open_store(data_path=DATA_PATH, path=STORE_PATH, rebuild=False):
+    """`AnalyticalStore` of `data_path`, built first when missing or out of date."""
+    source_hash = file_hash(data_path)
+    if Path(path).exists() and not rebuild:
+        store = AnalyticalStore(path)
+        if store.source_hash == source_hash:
+            return store
+        store.close()
+    build_store(load_data(data_path), path, source_hash)
+    return AnalyticalStore(path)
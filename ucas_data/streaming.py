@@ -0,0 +1,94 @@
+"""Chunked ingestion for UCAS files larger than memory.
+
+The CSV is read `chunksize` rows at a time and every chunk goes through the
+same checks and filters as `clean_data` before being appended to an Arrow
+IPC file, so peak memory is bounded by the chunk size rather than the file.
+The result is identical to the in-memory path, including the categories of
+`inst_all`: a first, narrow pass over the three filter columns collects the
+institutions that survive cleaning, so every batch is written with the same
+dictionary. Requires `pyarrow`.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+from .cleaning import CLEANING_PARAMS, check_institution_code, filter_rows
+from .instrumentation import traced
+from .loader import DATA_PATH, DTYPES, apply_schema
+
+CHUNKSIZE = 100_000
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError('streaming ingestion requires pyarrow') from e
+    return pa
+
+
+def iter_chunks(path=DATA_PATH, chunksize=CHUNKSIZE, validate=True, usecols=None):
+    """Yield typed chunks of a UCAS data file."""
+    dtype = {col: DTYPES[col] for col in usecols} if usecols else DTYPES
+    with pd.read_csv(path, dtype=dtype, usecols=usecols, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield apply_schema(chunk, validate=validate)
+
+
+def kept_institutions(path=DATA_PATH, chunksize=CHUNKSIZE, **params):
+    """Sorted `inst_all` values that survive cleaning, read chunk by chunk."""
+    params = {**CLEANING_PARAMS, **params}
+    institutions = set()
+    for chunk in iter_chunks(
+        path,
+        chunksize,
+        validate=False,
+        usecols=['inst_all', 'agegroup', 'equality_dimension'],
+    ):
+        institutions.update(filter_rows(chunk, **params)['inst_all'].unique())
+    return sorted(institutions)
+
+
+def iter_clean_chunks(path=DATA_PATH, chunksize=CHUNKSIZE, **params):
+    """Yield cleaned chunks of a UCAS data file.
+
+    Concatenating the chunks gives the same frame as
+    `clean_data(load_data(path), **params)`.
+    """
+    params = {**CLEANING_PARAMS, **params}
+    inst_dtype = pd.CategoricalDtype(kept_institutions(path, chunksize, **params))
+    for chunk in iter_chunks(path, chunksize):
+        check_institution_code(chunk)
+        chunk = filter_rows(chunk.drop(columns='INSTITUTION_CODE'), **params)
+        yield chunk.astype({'inst_all': inst_dtype})
+
+
+@traced('clean.stream')
+def stream_clean_data(path, target, chunksize=CHUNKSIZE, **params):
+    """Clean `path` chunk by chunk into the Arrow IPC file `target`.
+
+    Returns the number of rows written.
+    """
+    pa = _require_pyarrow()
+    target = Path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix('.tmp')
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in iter_clean_chunks(path, chunksize, **params):
+            batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pa.ipc.new_file(tmp, batch.schema)
+            writer.write_batch(batch)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f'{path} has no rows')
+    tmp.replace(target)
+    return rows
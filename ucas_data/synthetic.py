@@ -0,0 +1,250 @@
+"""Synthetic UCAS-shaped data for benchmarks.
+
+The real `UCAS_data_file.csv` is not part of the repository. This module
+generates files with its schema and cardinalities: ~132 institutions with
+three-character codes, the 2010-2021 cycles, the 12 statistics, the total,
+ethnicity, sex and area-based (POLAR4, or SIMD for a share of providers)
+equality dimensions and both agegroups. Values follow the relationships of
+the real data: counts are rounded to 5, offer rates are offers over June
+deadline applicants, percentage point differences can be negative, ~2% of
+the rate statistics are missing, and A66, W01 and W05 have all-zero first
+cycles. At scale 1 the file has about as many rows as the real one.
+
+`scale` multiplies the number of institutions, up to the 2,600 available
+codes; beyond that, earlier cycles are added. Rows are generated one cycle
+at a time with array operations, so `write_synthetic` never holds more than
+one cycle in memory.
+"""
+
+import string
+
+import numpy as np
+import pandas as pd
+
+from .loader import AGEGROUPS, EQUALITY_DIMENSIONS, STATISTICS
+
+INSTITUTIONS = 132
+CYCLES = range(2010, 2022)
+MAX_INSTITUTIONS = 26 * 100
+NAN_SHARE = 0.02
+
+# the institutions of the analysis, and the ones with missing first cycles
+NAMED_INSTITUTIONS = {
+    'A66': 'Arts University Bournemouth',
+    'B32': 'University of Birmingham',
+    'E14': 'University of East Anglia UEA',
+    'K60': 'Kings College London University of London',
+    'M20': 'University of Manchester',
+    'S18': 'University of Sheffield',
+    'W01': 'University of South Wales',
+    'W05': 'University of West London',
+    'Y50': 'University of York',
+}
+ZERO_CYCLES = {'A66': 1, 'W01': 4, 'W05': 2}
+
+SIMD_SHARE = 0.12
+
+COUNT_STATISTICS = [
+    'June deadline applicants',
+    'Placed June deadline applicants',
+    'All placed applicants',
+    'June deadline applications',
+    'Offers',
+]
+POPULATION_STATISTICS = [stat for stat in STATISTICS if 'per 10,000' in stat]
+RATE_STATISTICS = [
+    'Offer rate',
+    'Average offer rate',
+    'Percentage point difference between offer rate and average offer rate',
+    'Contribution of group to the average offer rate',
+]
+
+ETHNIC_DIMENSIONS = [dim for dim in EQUALITY_DIMENSIONS if 'ethnic' in dim]
+SEX_DIMENSIONS = ['Men', 'Women']
+POLAR_DIMENSIONS = [dim for dim in EQUALITY_DIMENSIONS if dim.startswith('POLAR4')]
+SIMD_DIMENSIONS = [dim for dim in EQUALITY_DIMENSIONS if dim.startswith('SIMD')]
+
+
+def institutions(count=INSTITUTIONS, seed=0):
+    """`count` sorted `inst_all` values, including the named institutions."""
+    rng = np.random.default_rng(seed)
+    codes = [f'{letter}{number:02d}' for letter in string.ascii_uppercase for number in range(100)]
+    named = sorted(NAMED_INSTITUTIONS)[:count]
+    others = sorted(set(codes) - set(named))
+    picked = rng.choice(len(others), size=count - len(named), replace=False)
+    codes = sorted(named + [others[i] for i in picked])
+    return [f'{code} {NAMED_INSTITUTIONS.get(code, f"Synthetic University {code}")}' for code in codes]
+
+
+def shape(scale=1):
+    """Number of institutions and list of cycles generated at `scale`."""
+    count = min(max(round(INSTITUTIONS * scale), len(NAMED_INSTITUTIONS)), MAX_INSTITUTIONS)
+    cycles = len(CYCLES)
+    if count == MAX_INSTITUTIONS:
+        cycles = max(cycles, int(np.ceil(INSTITUTIONS * len(CYCLES) * scale / count)))
+    return count, list(range(CYCLES.stop - cycles, CYCLES.stop))
+
+
+def _layout(area_dimensions):
+    """(statistic, dimension) cells of an institution using `area_dimensions`."""
+    dimensions = ['Total', *ETHNIC_DIMENSIONS, *SEX_DIMENSIONS, *area_dimensions]
+    return (
+        [(stat, dim) for stat in COUNT_STATISTICS for dim in dimensions]
+        + [(stat, dim) for stat in POPULATION_STATISTICS for dim in area_dimensions]
+        + [(stat, dim) for stat in RATE_STATISTICS for dim in dimensions]
+    )
+
+
+def _round5(values):
+    return np.round(values / 5) * 5
+
+
+def _split(rng, totals, concentration):
+    """Split `totals` (one per institution) into groups with Dirichlet shares."""
+    return totals[:, None] * rng.dirichlet(concentration, size=len(totals))
+
+
+class _Profile:
+    """Per-institution parameters that stay stable across cycles."""
+
+    def __init__(self, rng, codes):
+        count = len(codes)
+        self.size = rng.lognormal(7.5, 0.8, count)
+        self.growth = rng.normal(0.02, 0.02, count)
+        self.young = rng.uniform(0.4, 0.7, count)
+        self.rate = rng.uniform(0.6, 0.9, count)
+        self.gap = rng.uniform(0, 0.25, count)
+        self.gap_trend = rng.normal(-0.005, 0.01, count)
+        # the named institutions are English and Welsh: always on POLAR4
+        named = np.isin(codes, list(NAMED_INSTITUTIONS))
+        self.simd = (rng.random(count) < SIMD_SHARE) & ~named
+
+
+def _cycle_values(rng, profile, step):
+    """Values of every statistic, (statistic, institution, dimension, agegroup)."""
+    count = len(profile.size)
+    all_ages = profile.size * (1 + profile.growth) ** step
+    total = np.stack([all_ages * profile.young, all_ages], axis=1)
+
+    applicants = np.zeros((count, len(EQUALITY_DIMENSIONS), len(AGEGROUPS)))
+    position = {dim: i for i, dim in enumerate(EQUALITY_DIMENSIONS)}
+    area = np.array([1, 1.4, 1.8, 2.2, 3.0])
+    for a in range(len(AGEGROUPS)):
+        applicants[:, position['Total'], a] = total[:, a]
+        ethnic = _split(rng, total[:, a], [20, 3, 4, 2, 1])
+        sex = _split(rng, total[:, a], [10, 12])
+        quintiles = _split(rng, total[:, a], area * 5)
+        for dims, values in [(ETHNIC_DIMENSIONS, ethnic), (SEX_DIMENSIONS, sex)]:
+            applicants[:, [position[d] for d in dims], a] = values
+        applicants[:, [position[d] for d in POLAR_DIMENSIONS], a] = quintiles
+        applicants[:, [position[d] for d in SIMD_DIMENSIONS], a] = quintiles
+    applicants = np.maximum(_round5(applicants), 5)
+
+    # offer rates rise with the quintile, by a gap that narrows or widens over time
+    gap = np.clip(profile.gap + profile.gap_trend * step, 0, 0.4)
+    offset = np.zeros((count, len(EQUALITY_DIMENSIONS)))
+    quintile = np.linspace(-0.5, 0.5, 5)
+    for dims in [POLAR_DIMENSIONS, SIMD_DIMENSIONS]:
+        offset[:, [position[d] for d in dims]] = gap[:, None] * quintile
+    offset += rng.normal(0, 0.02, offset.shape)
+    rate = np.clip(profile.rate[:, None, None] + offset[:, :, None], 0.05, 0.99)
+
+    offers = np.minimum(_round5(applicants * rate), applicants)
+    placed = _round5(offers * rng.uniform(0.5, 0.7, offers.shape))
+    all_placed = _round5(placed * rng.uniform(1.05, 1.2, placed.shape))
+    applications = _round5(applicants * rng.uniform(1.5, 3, applicants.shape))
+    population = rng.uniform(5e4, 2e5, applicants.shape)
+
+    offer_rate = np.round(offers / applicants, 3)
+    average = np.repeat(offer_rate[:, [position['Total']], :], len(EQUALITY_DIMENSIONS), axis=1)
+    contribution = np.round(offer_rate * applicants / applicants[:, [position['Total']], :], 3)
+
+    per_population = lambda values: np.round(values / population * 1e4, 1)
+    values = {
+        'June deadline applicants': applicants,
+        'Placed June deadline applicants': placed,
+        'All placed applicants': all_placed,
+        'June deadline applicants per 10,000 population': per_population(applicants),
+        'Placed June deadline applicants per 10,000 population': per_population(placed),
+        'All placed applicants per 10,000 population': per_population(all_placed),
+        'June deadline applications': applications,
+        'Offers': offers,
+        'Offer rate': offer_rate,
+        'Average offer rate': average,
+        'Percentage point difference between offer rate and average offer rate': np.round(
+            (offer_rate - average) * 100, 1
+        ),
+        'Contribution of group to the average offer rate': contribution,
+    }
+    return np.stack([values[stat] for stat in STATISTICS])
+
+
+def _cycle_frame(rng, labels, profile, cycle, step, zero_cycles):
+    """Rows of one cycle for every institution."""
+    values = _cycle_values(rng, profile, step)
+    statistic_pos = {stat: i for i, stat in enumerate(STATISTICS)}
+    dimension_pos = {dim: i for i, dim in enumerate(EQUALITY_DIMENSIONS)}
+
+    frames = []
+    for simd, area in [(False, POLAR_DIMENSIONS), (True, SIMD_DIMENSIONS)]:
+        insts = np.flatnonzero(profile.simd == simd)
+        layout = _layout(area)
+        stats = np.array([statistic_pos[stat] for stat, _ in layout])
+        dims = np.array([dimension_pos[dim] for _, dim in layout])
+
+        # rows ordered by institution, then agegroup, then layout cell
+        inst = np.repeat(insts, len(AGEGROUPS) * len(layout))
+        agegroup = np.tile(np.repeat(np.arange(len(AGEGROUPS)), len(layout)), len(insts))
+        stat = np.tile(stats, len(insts) * len(AGEGROUPS))
+        dim = np.tile(dims, len(insts) * len(AGEGROUPS))
+        frames.append((inst, stat, dim, agegroup, values[stat, inst, dim, agegroup]))
+
+    inst, stat, dim, agegroup, value = (np.concatenate(parts) for parts in zip(*frames))
+    order = np.argsort(inst, kind='stable')
+    inst, stat, dim, agegroup, value = (a[order] for a in (inst, stat, dim, agegroup, value))
+
+    is_rate = np.isin(stat, [statistic_pos[s] for s in RATE_STATISTICS])
+    missing = rng.random(len(value)) < NAN_SHARE * len(value) / is_rate.sum()
+    value = np.where(is_rate & missing, np.nan, value)
+    value = np.where(np.isin(inst, zero_cycles), 0, value)
+
+    return pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=labels),
+        'INSTITUTION_CODE': pd.Categorical.from_codes(inst, categories=[label[:3] for label in labels]),
+        'Cycle': np.full(len(inst), cycle, dtype=np.int16),
+        'statistic': pd.Categorical.from_codes(stat, categories=STATISTICS),
+        'equality_dimension': pd.Categorical.from_codes(dim, categories=EQUALITY_DIMENSIONS),
+        'agegroup': pd.Categorical.from_codes(agegroup, categories=AGEGROUPS),
+        'value': value.astype(np.float32),
+    })
+
+
+def iter_synthetic(scale=1, seed=0):
+    """Yield the synthetic data at `scale`, one frame per cycle."""
+    rng = np.random.default_rng(seed)
+    count, cycles = shape(scale)
+    labels = institutions(count, seed)
+    codes = [label[:3] for label in labels]
+    profile = _Profile(rng, codes)
+
+    for step, cycle in enumerate(cycles):
+        zero = [codes.index(code) for code, n in ZERO_CYCLES.items() if code in codes and step < n]
+        yield _cycle_frame(rng, labels, profile, cycle, step, zero)
+
+
+def synthetic_data(scale=1, seed=0):
+    """The synthetic data at `scale` as a single frame."""
+    return pd.concat(iter_synthetic(scale, seed), ignore_index=True)
+
+
+def write_synthetic(path, scale=1, seed=0):
+    """Write the synthetic data at `scale` to the CSV file `path`, cycle by cycle.
+
+    Returns the number of rows written.
+    """
+    rows = 0
+    with open(path, 'w', newline='') as f:
+        for i, frame in enumerate(iter_synthetic(scale, seed)):
+            frame.to_csv(f, index=False, header=i == 0)
+            rows += len(frame)
+    return rows
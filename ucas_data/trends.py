@@ -0,0 +1,174 @@
+"""Trends and change-points of the offer rate gaps between POLAR4 quintiles.
+
+The analysis reads "stagnating" and "improving since 2016" off the charts.
+Here the gap between the offer rates of every pair of quintiles (the Q5-Q1
+amplitude among them) is taken from the `Cube` as an (institution x pair x
+cycle) array, and every series is fitted at once:
+
+- `slope`: least-squares trend of the gap, per cycle
+- `change_cycle`: first cycle of the second segment of the best two-segment
+  linear fit, with the slopes before and after and the share of the
+  single-line residual it explains (`change_gain`)
+
+Fits only use cumulative sums along the cycle axis, so every split of every
+series is evaluated with array operations and missing cycles are skipped.
+A narrowing gap is an improvement: `rank_improvement` sorts by slope.
+"""
+
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from .benchmarking import AGEGROUP
+from .cleaning import POLAR_DIMENSIONS
+from .cube import Cube
+from .instrumentation import traced
+
+PAIRS = tuple(combinations(POLAR_DIMENSIONS, 2))
+
+MIN_SEGMENT = 3
+
+
+def quintile_gaps(cube, pairs=PAIRS, agegroup=AGEGROUP):
+    """Offer rate of the high minus the low quintile of each of `pairs`.
+
+    Returns an (institution x pair x cycle) array.
+    """
+    low, high = (list(quintiles) for quintiles in zip(*pairs))
+    rates = cube.sel(statistic='Offer rate', agegroup=agegroup)
+    gaps = rates.sel(dimension=high).values - rates.sel(dimension=low).values
+    # (inst, cycle, pair) to (inst, pair, cycle)
+    return np.moveaxis(gaps, -1, 1)
+
+
+def _cumulative_sums(x, y):
+    """Running n, Σx, Σy, Σx², Σxy and Σy² along the last axis, from zero.
+
+    Missing values of `y` are left out.
+    """
+    valid = ~np.isnan(y)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    sums = np.stack([valid, x, y, x * x, x * y, y * y]).astype(np.float64)
+    zero = np.zeros(sums.shape[:-1] + (1,))
+    return np.concatenate([zero, np.cumsum(sums, axis=-1)], axis=-1)
+
+
+def _fit(sums):
+    """Slope and residual sum of squares of lines fitted on segment `sums`."""
+    n, sx, sy, sxx, sxy, syy = sums
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xx = sxx - sx * sx / n
+        xy = sxy - sx * sy / n
+        yy = syy - sy * sy / n
+        slope = xy / xx
+        sse = np.maximum(yy - slope * xy, 0)
+    return slope, sse, n
+
+
+def linear_trends(values, x):
+    """Least-squares slope of every series of `values` (last axis) against `x`."""
+    x = np.asarray(x, dtype=np.float64)
+    sums = _cumulative_sums(x - x.mean(), values)
+    slope, _, _ = _fit(sums[..., -1])
+    return slope
+
+
+def change_points(values, x, min_segment=MIN_SEGMENT):
+    """Best split of every series of `values` into two linear segments.
+
+    Each segment needs at least `min_segment` values. Returns the position of
+    the first value of the second segment (-1 when no split is possible), the
+    slopes before and after it and the share of the residual sum of squares
+    of a single line that the split removes.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) < 2 * min_segment:
+        # too few cycles for two segments: no split to search
+        shape = np.shape(values)[:-1]
+        return np.full(shape, -1), np.full(shape, np.nan), np.full(shape, np.nan), np.full(shape, np.nan)
+    sums = _cumulative_sums(x - x.mean(), values)
+    _, sse, _ = _fit(sums[..., -1])
+
+    splits = np.arange(1, len(x))
+    left_slope, left_sse, left_n = _fit(sums[..., splits])
+    right_slope, right_sse, right_n = _fit(sums[..., -1:] - sums[..., splits])
+    split_sse = np.where(
+        (left_n >= min_segment) & (right_n >= min_segment),
+        left_sse + right_sse,
+        np.inf,
+    )
+
+    best = np.argmin(split_sse, axis=-1)[..., None]
+    found = np.isfinite(np.take_along_axis(split_sse, best, axis=-1))[..., 0]
+    pick = lambda a: np.where(found, np.take_along_axis(a, best, axis=-1)[..., 0], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gain = np.where(found, 1 - pick(split_sse) / sse, np.nan)
+    return np.where(found, splits[best[..., 0]], -1), pick(left_slope), pick(right_slope), gain
+
+
+def _gap_cube(data):
+    return data if isinstance(data, Cube) else Cube.from_frame(data)
+
+
+def gap_series(data, pairs=PAIRS, agegroup=AGEGROUP):
+    """Long frame of the gap of each quintile pair, institution and cycle."""
+    cube = _gap_cube(data)
+    gaps = quintile_gaps(cube, pairs, agegroup)
+    inst, pair, cycle = np.nonzero(~np.isnan(gaps))
+    low, high = (np.array(quintiles) for quintiles in zip(*pairs))
+    return pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=cube.coords['inst']),
+        'Cycle': cube.coords['cycle'].to_numpy()[cycle],
+        'low': pd.Categorical(low[pair], categories=POLAR_DIMENSIONS),
+        'high': pd.Categorical(high[pair], categories=POLAR_DIMENSIONS),
+        'gap': gaps[inst, pair, cycle],
+    })
+
+
+@traced('trends')
+def gap_trends(data, pairs=PAIRS, agegroup=AGEGROUP, min_segment=MIN_SEGMENT):
+    """Trend and change-point of the gap of each quintile pair of every institution.
+
+    `data` is the cleaned data or its `Cube`. Returns one row per
+    (inst_all, low, high) with the number of cycles with a gap, the first and
+    last gaps, the trend `slope` and the change-point columns (see
+    `change_points`). Slopes are in offer rate per cycle.
+    """
+    cube = _gap_cube(data)
+    cycles = cube.coords['cycle'].to_numpy()
+    gaps = quintile_gaps(cube, pairs, agegroup).astype(np.float64)
+    valid = ~np.isnan(gaps)
+
+    first = np.take_along_axis(gaps, valid.argmax(axis=-1)[..., None], axis=-1)[..., 0]
+    last_pos = gaps.shape[-1] - 1 - valid[..., ::-1].argmax(axis=-1)
+    last = np.take_along_axis(gaps, last_pos[..., None], axis=-1)[..., 0]
+    position, before, after, gain = change_points(gaps, cycles, min_segment)
+
+    institutions = cube.coords['inst']
+    low, high = (np.array(quintiles) for quintiles in zip(*pairs))
+    inst = np.repeat(np.arange(len(institutions)), len(pairs))
+    pair = np.tile(np.arange(len(pairs)), len(institutions))
+    trends = pd.DataFrame({
+        'inst_all': pd.Categorical.from_codes(inst, categories=institutions),
+        'low': pd.Categorical(low[pair], categories=POLAR_DIMENSIONS),
+        'high': pd.Categorical(high[pair], categories=POLAR_DIMENSIONS),
+        'cycles': valid.sum(axis=-1).ravel(),
+        'first_gap': first.ravel(),
+        'last_gap': last.ravel(),
+        'slope': linear_trends(gaps, cycles).ravel(),
+        'change_cycle': pd.array(cycles[position].ravel(), dtype='Int16'),
+        'slope_before': before.ravel(),
+        'slope_after': after.ravel(),
+        'change_gain': gain.ravel(),
+    })
+    # position -1: no change-point
+    trends.loc[position.ravel() < 0, 'change_cycle'] = pd.NA
+    return trends[trends['cycles'] > 0].reset_index(drop=True)
+
+
+def rank_improvement(trends, low='POLAR4 Q1', high='POLAR4 Q5', by='slope'):
+    """Institutions of `trends` for one quintile pair, fastest narrowing gap first."""
+    pair = trends[(trends['low'] == low) & (trends['high'] == high)]
+    return pair.sort_values(by, na_position='last').reset_index(drop=True)